@@ -1,4 +1,5 @@
 from threading import Thread
+from typing import Optional
 
 import telegram
 import time
@@ -11,6 +12,7 @@ import json
 
 from _version import __VERSION__
 from fa_export_api import FAExportAPI
+from file_id_cache import FileIdCache
 from functionalities.beep import BeepFunctionality
 from functionalities.image_hash_recommend import ImageHashRecommendFunctionality
 from functionalities.inline import InlineFunctionality
@@ -18,7 +20,9 @@ from functionalities.neaten import NeatenFunctionality
 from functionalities.subscriptions import SubscriptionFunctionality, BlocklistFunctionality
 from functionalities.unhandled import UnhandledMessageFunctionality
 from functionalities.welcome import WelcomeFunctionality
+from rate_limiter import RateLimiter, Priority
 from subscription_watcher import SubscriptionWatcher
+from update_batcher import UpdateBatcher
 
 
 class MQBot(telegram.bot.Bot):
@@ -57,27 +61,54 @@ class MQBot(telegram.bot.Bot):
     def send_audio(self, chat_id, *args, **kwargs):
         return self._send_audio(chat_id, *args, **kwargs, isgroup=chat_id < 0)
 
+    @mq.queuedmessage
+    def _send_media_group(self, *args, **kwargs):
+        return super(MQBot, self).send_media_group(*args, **kwargs)
+
+    def send_media_group(self, chat_id, *args, **kwargs):
+        return self._send_media_group(chat_id, *args, **kwargs, isgroup=chat_id < 0)
+
 
 class FASearchBot:
 
     VERSION = __VERSION__
+    FILE_ID_CACHE_SIZE = 10000
 
     def __init__(self, conf_file):
         with open(conf_file, 'r') as f:
             self.config = json.load(f)
         self.bot_key = self.config["bot_key"]
         self.api_url = self.config['api_url']
-        self.api = FAExportAPI(self.config['api_url'])
+        self.api = FAExportAPI(self.config['api_url'], self.config.get('api_pool_size'), self._create_rate_limiter())
+        self.file_id_cache = FileIdCache.load_from_json(self.FILE_ID_CACHE_SIZE)
         self.bot = None
         self.alive = False
         self.functionalities = []
         self.subscription_watcher = None
         self.subscription_watcher_thread = None
 
+    def _create_rate_limiter(self) -> Optional[RateLimiter]:
+        if "api_rate_limit" not in self.config and "api_background_rate_limit" not in self.config:
+            return None
+        rate = self.config.get("api_rate_limit", FAExportAPI.RATE_LIMIT)
+        background_rate = self.config.get("api_background_rate_limit", FAExportAPI.BACKGROUND_RATE_LIMIT)
+        return RateLimiter(rate, rate * 2, {Priority.BACKGROUND: (background_rate, background_rate)})
+
     def start(self):
         request = Request(con_pool_size=8)
         self.bot = MQBot(token=self.bot_key, request=request)
-        self.subscription_watcher = SubscriptionWatcher.load_from_json(self.api, self.bot)
+        if "subscriptions_db" in self.config:
+            self.subscription_watcher = SubscriptionWatcher.load_from_sqlite(
+                self.api, self.bot, self.config["subscriptions_db"]
+            )
+        else:
+            self.subscription_watcher = SubscriptionWatcher.load_from_json(self.api, self.bot)
+        if "subscription_delivery_mode" in self.config:
+            self.subscription_watcher.batcher = UpdateBatcher(
+                self.config["subscription_delivery_mode"],
+                self.config.get("subscription_flush_window", UpdateBatcher.DEFAULT_FLUSH_WINDOW)
+            )
+        self.subscription_watcher.file_id_cache = self.file_id_cache
         self.subscription_watcher_thread = Thread(target=self.subscription_watcher.run)
         updater = Updater(bot=self.bot, use_context=True)
         dispatcher = updater.dispatcher
@@ -103,13 +134,14 @@ class FASearchBot:
         # Kill the sub watcher
         self.subscription_watcher.running = False
         self.subscription_watcher_thread.join()
+        self.file_id_cache.save_to_json()
 
     def initialise_functionalities(self):
         return [
             BeepFunctionality(),
             WelcomeFunctionality(),
             ImageHashRecommendFunctionality(),
-            NeatenFunctionality(self.api),
+            NeatenFunctionality(self.api, self.file_id_cache),
             InlineFunctionality(self.api),
             SubscriptionFunctionality(self.subscription_watcher),
             BlocklistFunctionality(self.subscription_watcher),
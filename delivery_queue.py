@@ -0,0 +1,126 @@
+import collections
+import datetime
+import queue
+import threading
+from typing import Callable, List, Deque, NamedTuple, Optional, Any
+
+import requests
+from telegram.error import NetworkError, BadRequest, RetryAfter
+from telegram.utils.promise import Promise
+
+
+def wait_until_sent(sent: Any) -> Any:
+    """
+    Messages sent through the message queue are only sent later, and return a promise, so this waits for them to be
+    sent, and raises any error sending them, so that delivery jobs see the error and can retry.
+    """
+    if isinstance(sent, Promise):
+        return sent.result()
+    return sent
+
+
+class DeliveryJob:
+    """
+    A message to send. The send function must only return once the message has been sent, raising if it was not.
+    """
+
+    def __init__(self, destination: int, send: Callable[[], None], description: str):
+        self.destination = destination
+        self.send = send
+        self.description = description
+        self.attempts = 0
+
+
+class DeadLetter(NamedTuple):
+    job: DeliveryJob
+    error: Exception
+    failed_at: datetime.datetime
+
+
+class DeliveryQueue:
+    """
+    Sends messages on a pool of worker threads, so a slow send does not hold up anything else.
+    Jobs for the same destination always go to the same worker, so they are sent in the order they were queued.
+    Jobs failing with transient errors are retried, and jobs which still fail are recorded as dead letters.
+    """
+    MAX_RETRIES = 3
+    RETRY_DELAY = 2
+    DEAD_LETTER_LIMIT = 100
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.dead_letters = collections.deque(maxlen=self.DEAD_LETTER_LIMIT)  # type: Deque[DeadLetter]
+        self._queues = []  # type: List[queue.Queue]
+        self._threads = []  # type: List[threading.Thread]
+        self._stopping = threading.Event()
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._queues = [queue.Queue() for _ in range(self.workers)]
+        self._threads = [
+            threading.Thread(target=self._work, args=(job_queue,), name=f"delivery_{num}", daemon=True)
+            for num, job_queue in enumerate(self._queues)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """
+        Sends everything already queued, then stops the workers. Retries waiting to happen are given up on.
+        """
+        self._stopping.set()
+        for job_queue in self._queues:
+            job_queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def put(self, job: DeliveryJob) -> None:
+        self._queues[job.destination % self.workers].put(job)
+
+    def join(self) -> None:
+        for job_queue in self._queues:
+            job_queue.join()
+
+    def pending(self) -> int:
+        return sum(job_queue.unfinished_tasks for job_queue in self._queues)
+
+    def _work(self, job_queue: queue.Queue) -> None:
+        while True:
+            job = job_queue.get()
+            try:
+                if job is None:
+                    return
+                self._deliver(job)
+            finally:
+                job_queue.task_done()
+
+    def _deliver(self, job: DeliveryJob) -> None:
+        while True:
+            job.attempts += 1
+            try:
+                job.send()
+                return
+            except Exception as e:
+                retry_delay = self._retry_delay(job, e)
+                if retry_delay is None or self._stopping.wait(retry_delay):
+                    self._dead_letter(job, e)
+                    return
+
+    def _retry_delay(self, job: DeliveryJob, error: Exception) -> Optional[float]:
+        if job.attempts > self.MAX_RETRIES:
+            return None
+        if error.__cause__ is not None and isinstance(error.__cause__, (requests.ConnectionError, requests.Timeout)):
+            # Such as failing to find a file's size, because of a connection error
+            error = error.__cause__
+        if isinstance(error, RetryAfter):
+            return error.retry_after
+        if isinstance(error, NetworkError) and not isinstance(error, BadRequest):
+            return self.RETRY_DELAY * 2 ** (job.attempts - 1)
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return self.RETRY_DELAY * 2 ** (job.attempts - 1)
+        return None
+
+    def _dead_letter(self, job: DeliveryJob, error: Exception) -> None:
+        print(f"Failed to send {job.description} to {job.destination} because {error}.")
+        self.dead_letters.append(DeadLetter(job, error, datetime.datetime.now()))
@@ -1,9 +1,14 @@
 import time
-from typing import List
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from fa_submission import FASubmission, FASubmissionShort, FASubmissionFull, FASubmissionShortFav
+from fa_submission import FASubmission, FASubmissionFull
+from rate_limiter import RateLimiter, Priority
+from retry_policy import RetryPolicy, RetryBudget, CircuitBreaker
+from single_flight import SingleFlight
+from submission_page import SubmissionPage
+from ttl_cache import TTLCache
 
 
 class PageNotFound(Exception):
@@ -11,74 +16,143 @@ class PageNotFound(Exception):
 
 
 class FAExportAPI:
-    MAX_RETRIES = 7
+    POOL_SIZE = 10
+    SUBMISSION_CACHE_SIZE = 1000
+    SUBMISSION_CACHE_TTL = 600
+    RATE_LIMIT = 10
+    RATE_LIMIT_BURST = 20
+    BACKGROUND_RATE_LIMIT = 5
+    # Inline queries need answering before telegram gives up on them, the watcher can afford to wait
+    RETRY_POLICIES = {
+        Priority.INTERACTIVE: RetryPolicy(max_retries=3, deadline=6),
+        Priority.BACKGROUND: RetryPolicy(max_retries=7, deadline=120),
+    }
+    RETRY_BUDGET_RATIO = 0.2
+    RETRY_BUDGET_CAPACITY = 10
+    CIRCUIT_FAILURE_THRESHOLD = 10
+    CIRCUIT_RESET_TIMEOUT = 30
 
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, pool_size: int = None, rate_limiter: RateLimiter = None):
         self.base_url = base_url.rstrip("/")
+        if pool_size is None:
+            pool_size = self.POOL_SIZE
+        self.session = self._create_session(pool_size)
+        if rate_limiter is None:
+            rate_limiter = RateLimiter(
+                self.RATE_LIMIT,
+                self.RATE_LIMIT_BURST,
+                {Priority.BACKGROUND: (self.BACKGROUND_RATE_LIMIT, self.BACKGROUND_RATE_LIMIT)}
+            )
+        self.rate_limiter = rate_limiter
+        self.retry_policies = dict(self.RETRY_POLICIES)
+        self.retry_budget = RetryBudget(self.RETRY_BUDGET_RATIO, self.RETRY_BUDGET_CAPACITY)
+        self.circuit_breaker = CircuitBreaker(self.CIRCUIT_FAILURE_THRESHOLD, self.CIRCUIT_RESET_TIMEOUT)
+        self.submission_cache = TTLCache(
+            self.SUBMISSION_CACHE_SIZE, self.SUBMISSION_CACHE_TTL
+        )  # type: TTLCache[str, FASubmissionFull]
+        self.request_flights = SingleFlight()  # type: SingleFlight[requests.Response]
 
-    def _api_request(self, path: str) -> requests.Response:
+    @staticmethod
+    def _create_session(pool_size: int) -> requests.Session:
+        # One shared session, so connections are kept alive and reused by the watcher and dispatcher threads
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _api_request(
+            self, path: str, priority: Priority = Priority.INTERACTIVE, timeout: float = None
+    ) -> requests.Response:
         path = path.lstrip("/")
-        return requests.get(f"{self.base_url}/{path}")
+        self.rate_limiter.acquire(priority)
+        return self.session.get(f"{self.base_url}/{path}", timeout=timeout)
+
+    def _api_request_with_retry(self, path: str, priority: Priority = Priority.INTERACTIVE) -> requests.Response:
+        # Identical requests made concurrently by different threads share one request and response. Priority is part of
+        # the key, so an interactive request never waits behind the background rate limit and deadline.
+        return self.request_flights.do(
+            (path, priority), lambda: self._api_request_with_retry_uncoalesced(path, priority)
+        )
 
-    def _api_request_with_retry(self, path: str) -> requests.Response:
-        resp = self._api_request(path)
-        for tries in range(self.MAX_RETRIES):
-            if str(resp.status_code)[0] != "5":
+    def _api_request_with_retry_uncoalesced(self, path: str, priority: Priority) -> requests.Response:
+        policy = self.retry_policies[priority]
+        deadline_time = policy.start()
+        self.retry_budget.record_request()
+        tries = 0
+        while True:
+            self.circuit_breaker.check()
+            try:
+                resp = self._api_request(path, priority, policy.request_timeout(deadline_time))
+                error = None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                resp, error = None, e
+            except Exception:
+                # Not worth retrying, but still a failed request, so the circuit breaker needs to know
+                self.circuit_breaker.record_failure()
+                raise
+            if error is None and str(resp.status_code)[0] != "5":
+                self.circuit_breaker.record_success()
+                return resp
+            self.circuit_breaker.record_failure()
+            delay = policy.backoff(tries)
+            if not policy.should_retry(tries, delay, deadline_time) or not self.retry_budget.try_spend():
+                if error is not None:
+                    raise error
                 return resp
-            time.sleep(tries ** 2)
-            resp = self._api_request(path)
-        return resp
+            time.sleep(delay)
+            tries += 1
 
-    def get_full_submission(self, submission_id: str) -> FASubmissionFull:
-        sub_resp = self._api_request_with_retry(f"submission/{submission_id}.json")
+    def get_full_submission(
+            self, submission_id: str, priority: Priority = Priority.INTERACTIVE
+    ) -> FASubmissionFull:
+        submission_id = str(submission_id)
+        cached = self.submission_cache.get(submission_id)
+        if cached is not None:
+            return cached
+        sub_resp = self._api_request_with_retry(f"submission/{submission_id}.json", priority)
         # If API returns fine
         if sub_resp.status_code == 200:
             submission = FASubmission.from_full_dict(sub_resp.json())
+            self.submission_cache.put(submission_id, submission)
             return submission
         else:
             raise PageNotFound(f"Submission not found with ID: {submission_id}")
 
-    def get_user_folder(self, user: str, folder: str, page: int = 1) -> List[FASubmissionShort]:
+    def invalidate_submission(self, submission_id: str) -> None:
+        self.submission_cache.invalidate(str(submission_id))
+
+    def get_user_folder(
+            self, user: str, folder: str, page: int = 1, priority: Priority = Priority.INTERACTIVE
+    ) -> SubmissionPage:
         if user.strip() == "":
             raise PageNotFound(f"User not found by name: {user}")
-        resp = self._api_request_with_retry(f"user/{user}/{folder}.json?page={page}&full=1")
+        resp = self._api_request_with_retry(f"user/{user}/{folder}.json?page={page}&full=1", priority)
         if resp.status_code == 200:
-            data = resp.json()
-            submissions = []
-            for submission_data in data:
-                submissions.append(FASubmission.from_short_dict(submission_data))
-            return submissions
+            return SubmissionPage(resp.json())
         else:
             raise PageNotFound(f"User not found by name: {user}")
 
-    def get_user_favs(self, user: str, next_id: str = None) -> List[FASubmissionShortFav]:
+    def get_user_favs(
+            self, user: str, next_id: str = None, priority: Priority = Priority.INTERACTIVE
+    ) -> SubmissionPage:
         if user.strip() == "":
             raise PageNotFound(f"User not found by name: {user}")
         next_str = ""
         if next_id is not None:
             next_str = f"next={next_id}&"
-        resp = self._api_request_with_retry(f"user/{user}/favorites.json?{next_str}full=1")
+        resp = self._api_request_with_retry(f"user/{user}/favorites.json?{next_str}full=1", priority)
         if resp.status_code == 200:
-            data = resp.json()
-            submissions = []
-            for submission_data in data:
-                submissions.append(FASubmission.from_short_dict(submission_data))
-            return submissions
+            return SubmissionPage(resp.json())
         else:
             raise PageNotFound(f"User not found by name: {user}")
 
-    def get_search_results(self, query: str, page: int = 1) -> List[FASubmissionShort]:
-        resp = self._api_request_with_retry(f"search.json?full=1&perpage=48&q={query}&page={page}")
-        data = resp.json()
-        submissions = []
-        for submission_data in data:
-            submissions.append(FASubmission.from_short_dict(submission_data))
-        return submissions
-
-    def get_browse_page(self, page: int = 1) -> List[FASubmissionShort]:
-        resp = self._api_request_with_retry(f"browse.json?page={page}")
-        data = resp.json()
-        submissions = []
-        for submission_data in data:
-            submissions.append(FASubmission.from_short_dict(submission_data))
-        return submissions
+    def get_search_results(
+            self, query: str, page: int = 1, priority: Priority = Priority.INTERACTIVE
+    ) -> SubmissionPage:
+        resp = self._api_request_with_retry(f"search.json?full=1&perpage=48&q={query}&page={page}", priority)
+        return SubmissionPage(resp.json())
+
+    def get_browse_page(self, page: int = 1, priority: Priority = Priority.INTERACTIVE) -> SubmissionPage:
+        resp = self._api_request_with_retry(f"browse.json?page={page}", priority)
+        return SubmissionPage(resp.json())
@@ -0,0 +1,112 @@
+import asyncio
+from typing import List, Tuple, Any, Optional, Iterable
+
+import aiohttp
+
+from fa_export_api import PageNotFound
+from fa_submission import FASubmission, FASubmissionFull
+from submission_page import SubmissionPage
+
+
+class AsyncFAExportAPI:
+    """
+    Standalone asyncio client for the FA API, for fetching many submissions concurrently from one thread.
+    The bot does not use it, and it does not share FAExportAPI's cache, rate limiter, retry policies or circuit breaker.
+    """
+    MAX_RETRIES = 7
+    POOL_SIZE = 10
+
+    def __init__(self, base_url: str, pool_size: int = None):
+        self.base_url = base_url.rstrip("/")
+        if pool_size is None:
+            pool_size = self.POOL_SIZE
+        self.pool_size = pool_size
+        self._session = None  # type: Optional[aiohttp.ClientSession]
+
+    async def __aenter__(self) -> 'AsyncFAExportAPI':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # The session has to be created inside the running event loop, so it is created on first use
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.pool_size)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _api_request(self, path: str) -> Tuple[int, Any]:
+        path = path.lstrip("/")
+        async with self._get_session().get(f"{self.base_url}/{path}") as resp:
+            if resp.status != 200:
+                return resp.status, None
+            return resp.status, await resp.json(content_type=None)
+
+    async def _api_request_with_retry(self, path: str) -> Tuple[int, Any]:
+        status, data = await self._api_request(path)
+        for tries in range(self.MAX_RETRIES):
+            if str(status)[0] != "5":
+                return status, data
+            await asyncio.sleep(tries ** 2)
+            status, data = await self._api_request(path)
+        return status, data
+
+    async def get_full_submission(self, submission_id: str) -> FASubmissionFull:
+        status, data = await self._api_request_with_retry(f"submission/{submission_id}.json")
+        # If API returns fine
+        if status == 200:
+            submission = FASubmission.from_full_dict(data)
+            return submission
+        else:
+            raise PageNotFound(f"Submission not found with ID: {submission_id}")
+
+    async def get_full_submissions(self, submission_ids: Iterable[str]) -> List[Optional[FASubmissionFull]]:
+        """
+        Fetches all the given submissions concurrently, returning them in the order requested.
+        Submissions which could not be found are returned as None.
+        """
+        async def get_or_none(submission_id: str) -> Optional[FASubmissionFull]:
+            try:
+                return await self.get_full_submission(submission_id)
+            except PageNotFound:
+                return None
+        return list(await asyncio.gather(*[get_or_none(sub_id) for sub_id in submission_ids]))
+
+    async def get_user_folder(self, user: str, folder: str, page: int = 1) -> SubmissionPage:
+        if user.strip() == "":
+            raise PageNotFound(f"User not found by name: {user}")
+        status, data = await self._api_request_with_retry(f"user/{user}/{folder}.json?page={page}&full=1")
+        if status == 200:
+            return SubmissionPage(data)
+        else:
+            raise PageNotFound(f"User not found by name: {user}")
+
+    async def get_user_favs(self, user: str, next_id: str = None) -> SubmissionPage:
+        if user.strip() == "":
+            raise PageNotFound(f"User not found by name: {user}")
+        next_str = ""
+        if next_id is not None:
+            next_str = f"next={next_id}&"
+        status, data = await self._api_request_with_retry(f"user/{user}/favorites.json?{next_str}full=1")
+        if status == 200:
+            return SubmissionPage(data)
+        else:
+            raise PageNotFound(f"User not found by name: {user}")
+
+    async def get_search_results(self, query: str, page: int = 1) -> SubmissionPage:
+        status, data = await self._api_request_with_retry(f"search.json?full=1&perpage=48&q={query}&page={page}")
+        if status != 200:
+            raise ValueError(f"Search request failed with status: {status}")
+        return SubmissionPage(data)
+
+    async def get_browse_page(self, page: int = 1) -> SubmissionPage:
+        status, data = await self._api_request_with_retry(f"browse.json?page={page}")
+        if status != 200:
+            raise ValueError(f"Browse request failed with status: {status}")
+        return SubmissionPage(data)
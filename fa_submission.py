@@ -1,11 +1,18 @@
 import re
-from abc import ABC
+import string
+from abc import ABCMeta
+from concurrent.futures import Future
 from enum import Enum
-from typing import Dict, Union, List
+from typing import Dict, Union, List, FrozenSet, Optional, Any, Callable
 
-import requests
 import telegram
-from telegram import InlineQueryResultPhoto
+from telegram import InlineQueryResultPhoto, InputMediaPhoto
+from telegram.error import BadRequest
+
+from delivery_queue import wait_until_sent
+from file_id_cache import FileIdCache
+from file_size_probe import FileSizeProbe, ProbeFailed
+from ttl_cache import TTLCache
 
 
 class CantSendFileType(Exception):
@@ -18,12 +25,28 @@ class Rating(Enum):
     ADULT = 3
 
 
-class FAUser(ABC):
+class FAUser(metaclass=ABCMeta):
+    """
+    Users are shared between every submission by them, so they cannot be changed once created.
+    """
+    __slots__ = ("name", "profile_name", "_link")
+    INTERNED_USERS = 10000
+    INTERNED_USER_TTL = 60 * 60
+    interned = TTLCache(INTERNED_USERS, INTERNED_USER_TTL)  # type: TTLCache[str, FAUserShort]
 
     def __init__(self, name: str, profile_name: str):
-        self.name = name
-        self.profile_name = profile_name
-        self.link = f"https://furaffinity.net/user/{profile_name}/"
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "profile_name", profile_name)
+        object.__setattr__(self, "_link", None)
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} cannot be changed")
+
+    @property
+    def link(self) -> str:
+        if self._link is None:
+            object.__setattr__(self, "_link", f"https://furaffinity.net/user/{self.profile_name}/")
+        return self._link
 
     @staticmethod
     def from_short_dict(short_dict: Dict[str, str]) -> Union['FAUserShort']:
@@ -33,17 +56,22 @@ class FAUser(ABC):
     def from_submission_dict(short_dict: Dict[str, str]) -> Union['FAUserShort']:
         name = short_dict['name']
         profile_name = short_dict['profile_name']
-        new_user = FAUserShort(name, profile_name)
-        return new_user
+        # The same few users make most submissions, so share one object for each of them
+        user = FAUser.interned.get(profile_name)
+        if user is None or user.name != name:
+            user = FAUserShort(name, profile_name)
+            FAUser.interned.put(profile_name, user)
+        return user
 
 
 class FAUserShort(FAUser):
+    __slots__ = ()
 
     def __init__(self, name: str, profile_name: str):
         super().__init__(name, profile_name)
 
 
-class FASubmission(ABC):
+class FASubmission(metaclass=ABCMeta):
     EXTENSIONS_DOCUMENT = ["doc", "docx", "rtf", "txt", "odt", "mid", "wav", "mpeg"]
     EXTENSIONS_AUTO_DOCUMENT = ["gif", "pdf"]
     EXTENSIONS_AUDIO = ["mp3"]
@@ -52,6 +80,11 @@ class FASubmission(ABC):
 
     SIZE_LIMIT_IMAGE = 5 * 1000 ** 2  # Maximum 5MB image size on telegram
     SIZE_LIMIT_DOCUMENT = 20 * 1000 ** 2  # Maximum 20MB document size on telegram
+    THUMBNAIL_SIZE = re.compile(r"@[0-9]+-")
+    LINK_ID = re.compile(r"view/([0-9]+)")
+    size_probe = FileSizeProbe()
+    # Pages of results build a lot of these, so they are slotted to keep them small
+    __slots__ = ("submission_id", "link")
 
     def __init__(self, submission_id: str) -> None:
         self.submission_id = submission_id
@@ -91,23 +124,23 @@ class FASubmission(ABC):
 
     @staticmethod
     def make_thumbnail_bigger(thumbnail_url: str) -> str:
-        return re.sub('@[0-9]+-', '@1600-', thumbnail_url)
+        return FASubmission.THUMBNAIL_SIZE.sub('@1600-', thumbnail_url)
 
     @staticmethod
     def make_thumbnail_smaller(thumbnail_url: str) -> str:
-        return re.sub('@[0-9]+-', '@300-', thumbnail_url)
+        return FASubmission.THUMBNAIL_SIZE.sub('@300-', thumbnail_url)
 
     @staticmethod
     def id_from_link(link: str) -> str:
-        return re.search('view/([0-9]+)', link).group(1)
+        return FASubmission.LINK_ID.search(link).group(1)
 
     @staticmethod
     def _get_file_size(url: str) -> int:
-        resp = requests.head(url)
-        return int(resp.headers['content-length'])
+        return FASubmission.size_probe.get_size(url)
 
 
 class FASubmissionShort(FASubmission):
+    __slots__ = ("thumbnail_url", "title", "author")
 
     def __init__(self, submission_id: str, thumbnail_url: str, title: str, author: FAUser) -> None:
         super().__init__(submission_id)
@@ -125,6 +158,7 @@ class FASubmissionShort(FASubmission):
 
 
 class FASubmissionShortFav(FASubmissionShort):
+    __slots__ = ("fav_id",)
 
     def __init__(self, submission_id: str, thumbnail_url: str, title: str, author: FAUser, fav_id: str) -> None:
         super().__init__(submission_id, thumbnail_url, title, author)
@@ -132,6 +166,11 @@ class FASubmissionShortFav(FASubmissionShort):
 
 
 class FASubmissionFull(FASubmissionShort):
+    SPLIT_WORDS = re.compile(r"[\s\"<>]+")
+    __slots__ = (
+        "download_url", "full_image_url", "description", "keywords", "rating",
+        "_download_file_size", "_download_file_size_future", "_words"
+    )
 
     def __init__(
             self,
@@ -152,14 +191,151 @@ class FASubmissionFull(FASubmissionShort):
         self.keywords = keywords
         self.rating = rating
         self._download_file_size = None
+        self._download_file_size_future = None  # type: Optional[Future[int]]
+        self._words = None  # type: Optional[FrozenSet[str]]
 
     @property
     def download_file_size(self) -> int:
         if self._download_file_size is None:
-            self._download_file_size = FASubmission._get_file_size(self.download_url)
+            if self._download_file_size_future is not None:
+                future = self._download_file_size_future
+                # A failed probe is forgotten, so the next attempt probes again, rather than failing for as long as
+                # this submission is cached
+                self._download_file_size_future = None
+                self._download_file_size = future.result()
+            else:
+                self._download_file_size = FASubmission._get_file_size(self.download_url)
         return self._download_file_size
 
-    def send_message(self, bot, chat_id: int, reply_to: int = None, prefix: str = None) -> None:
+    def start_file_size_probe(self) -> None:
+        """
+        Starts finding the file size in the background, if sending this submission will need it, so that it may be
+        ready by the time it is sent.
+        """
+        if self._download_file_size is not None or self._download_file_size_future is not None:
+            return
+        if not self._needs_file_size():
+            return
+        self._download_file_size_future = FASubmission.size_probe.probe(self.download_url)
+
+    def is_photo(self) -> bool:
+        ext = self.download_url.split(".")[-1].lower()
+        return ext in FASubmission.EXTENSIONS_PHOTO
+
+    def _needs_file_size(self) -> bool:
+        # Documents are always sent as a link, whatever their size
+        ext = self.download_url.split(".")[-1].lower()
+        return ext not in FASubmission.EXTENSIONS_DOCUMENT
+
+    @staticmethod
+    def fetch_file_sizes(submissions: List['FASubmissionFull']) -> None:
+        """
+        Finds the file size of every submission which doesn't know it yet, and will need it to be sent, probing them
+        all at once.
+        """
+        unknown = [
+            submission for submission in submissions
+            if submission._download_file_size is None and submission._needs_file_size()
+        ]
+        sizes = FASubmission.size_probe.probe_many(submission.download_url for submission in unknown)
+        for submission in unknown:
+            # Sizes which could not be found are left unknown, to be probed again when needed
+            if sizes[submission.download_url] is not None:
+                submission._download_file_size = sizes[submission.download_url]
+
+    @property
+    def words(self) -> FrozenSet[str]:
+        """
+        Lowercase words of the title, description and keywords, with punctuation stripped.
+        Worked out once, and then shared by every subscription checking this submission.
+        """
+        if self._words is None:
+            all_text = \
+                self.SPLIT_WORDS.split(self.title) + \
+                self.SPLIT_WORDS.split(self.description) + \
+                self.keywords
+            self._words = frozenset(x.lower().strip(string.punctuation) for x in all_text)
+        return self._words
+
+    def _file(self, file_id_cache: Optional[FileIdCache], send_type: str, url: str) -> str:
+        """
+        Returns the file_id telegram gave this file when it was last sent, or otherwise its URL.
+        """
+        if file_id_cache is None:
+            return url
+        file_id = file_id_cache.get(self.submission_id, send_type)
+        if file_id is None:
+            return url
+        return file_id
+
+    def _record_file(self, file_id_cache: Optional[FileIdCache], send_type: str, sent) -> None:
+        if file_id_cache is not None:
+            file_id_cache.record(self.submission_id, send_type, sent)
+
+    def _send_file(
+            self,
+            send: Callable[..., Any],
+            file_argument: str,
+            file_id_cache: Optional[FileIdCache],
+            send_type: str,
+            url: str,
+            **kwargs
+    ) -> Any:
+        """
+        Sends this submission's file, by its cached file_id if there is one. Telegram may no longer accept a cached
+        file_id, so those are waited on, and if rejected, forgotten and sent again from the URL.
+        """
+        file = self._file(file_id_cache, send_type, url)
+        if file != url:
+            try:
+                sent = wait_until_sent(send(**{file_argument: file}, **kwargs))
+                self._record_file(file_id_cache, send_type, sent)
+                return sent
+            except BadRequest as e:
+                print(f"Telegram rejected the cached file for submission {self.submission_id} because {e}")
+                file_id_cache.invalidate(self.submission_id, send_type)
+        sent = send(**{file_argument: url}, **kwargs)
+        self._record_file(file_id_cache, send_type, sent)
+        return sent
+
+    def to_input_media_photo(
+            self,
+            caption: str,
+            file_id_cache: Optional[FileIdCache] = None
+    ) -> Optional[InputMediaPhoto]:
+        """
+        Returns this submission as a photo to send in an album, or None if it is not a photo.
+        """
+        if not self.is_photo():
+            return None
+        try:
+            too_big = self.download_file_size > self.SIZE_LIMIT_IMAGE
+        except ProbeFailed as e:
+            # Rather than fail the whole album, send the thumbnail, with a link to the file
+            print(f"Sending the thumbnail of submission {self.submission_id} because {e}")
+            too_big = True
+        if too_big:
+            return InputMediaPhoto(
+                media=self._file(file_id_cache, FileIdCache.THUMBNAIL, self.thumbnail_url),
+                caption=f"{caption}\n[Direct download]({self.download_url})",
+                parse_mode=telegram.ParseMode.MARKDOWN  # Markdown is okay here, as the link text is hard coded.
+            )
+        return InputMediaPhoto(
+            media=self._file(file_id_cache, FileIdCache.PHOTO, self.download_url),
+            caption=caption
+        )
+
+    def send_message(
+            self,
+            bot,
+            chat_id: int,
+            reply_to: int = None,
+            prefix: str = None,
+            file_id_cache: Optional[FileIdCache] = None
+    ) -> Any:
+        """
+        Sends this submission, returning the sent message, or a promise of it when sent through the message queue.
+        """
         if prefix is None:
             prefix = ""
         else:
@@ -168,49 +344,64 @@ class FASubmissionFull(FASubmissionShort):
         # Handle photos
         if ext in FASubmission.EXTENSIONS_PHOTO:
             if self.download_file_size > self.SIZE_LIMIT_IMAGE:
-                bot.send_photo(
+                return self._send_file(
+                    bot.send_photo,
+                    "photo",
+                    file_id_cache,
+                    FileIdCache.THUMBNAIL,
+                    self.thumbnail_url,
                     chat_id=chat_id,
-                    photo=self.thumbnail_url,
                     caption=f"{prefix}{self.link}\n[Direct download]({self.download_url})",
                     reply_to_message_id=reply_to,
                     parse_mode=telegram.ParseMode.MARKDOWN  # Markdown is okay here, as the link text is hard coded.
                 )
-                return
-            bot.send_photo(
+            return self._send_file(
+                bot.send_photo,
+                "photo",
+                file_id_cache,
+                FileIdCache.PHOTO,
+                self.download_url,
                 chat_id=chat_id,
-                photo=self.download_url,
                 caption=f"{prefix}{self.link}",
                 reply_to_message_id=reply_to
             )
-            return
         # Handle files telegram can't handle
         if ext in FASubmission.EXTENSIONS_DOCUMENT or self.download_file_size > self.SIZE_LIMIT_DOCUMENT:
-            bot.send_photo(
+            return self._send_file(
+                bot.send_photo,
+                "photo",
+                file_id_cache,
+                FileIdCache.FULL_IMAGE,
+                self.full_image_url,
                 chat_id=chat_id,
-                photo=self.full_image_url,
                 caption=f"{prefix}{self.link}\n[Direct download]({self.download_url})",
                 reply_to_message_id=reply_to,
                 parse_mode=telegram.ParseMode.MARKDOWN  # Markdown is okay here, as the link text is hard coded.
             )
-            return
         # Handle gifs, and pdfs, which can be sent as documents
         if ext in FASubmission.EXTENSIONS_AUTO_DOCUMENT:
-            bot.send_document(
+            return self._send_file(
+                bot.send_document,
+                "document",
+                file_id_cache,
+                FileIdCache.DOCUMENT,
+                self.download_url,
                 chat_id=chat_id,
-                document=self.download_url,
                 caption=f"{prefix}{self.link}",
                 reply_to_message_id=reply_to
             )
-            return
         # Handle audio
         if ext in FASubmission.EXTENSIONS_AUDIO:
-            bot.send_audio(
+            return self._send_file(
+                bot.send_audio,
+                "audio",
+                file_id_cache,
+                FileIdCache.AUDIO,
+                self.download_url,
                 chat_id=chat_id,
-                audio=self.download_url,
                 caption=f"{prefix}{self.link}",
                 reply_to_message_id=reply_to
             )
-            return
         # Handle known error extensions
         if ext in FASubmission.EXTENSIONS_ERROR:
             raise CantSendFileType(f"I'm sorry, I can't neaten \".{ext}\" files.")
@@ -0,0 +1,119 @@
+import collections
+import json
+import os
+import threading
+from typing import Optional, Tuple, List, Any
+
+from telegram.utils.promise import Promise
+
+
+class FileIdCache:
+    """
+    Remembers the file_id telegram gives a submission's file once it has been sent, so that sending it again does not
+    need telegram to fetch it from FA again.
+    The least recently used entries are dropped when it is full, and it can be saved to and loaded from a file.
+    Messages sent through the message queue are only known once they have been sent, so those are recorded later.
+    """
+    PHOTO = "photo"
+    THUMBNAIL = "thumbnail"
+    FULL_IMAGE = "full_image"
+    DOCUMENT = "document"
+    AUDIO = "audio"
+    FILENAME = "file_ids.json"
+    FILENAME_TEMP = "file_ids.temp.json"
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()  # type: collections.OrderedDict[Tuple[str, str], str]
+        self._unsent = []  # type: List[Tuple[Tuple[str, str], Promise]]
+        self._lock = threading.Lock()
+
+    def get(self, submission_id: str, send_type: str) -> Optional[str]:
+        key = (submission_id, send_type)
+        with self._lock:
+            self._record_sent()
+            file_id = self._entries.get(key)
+            if file_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return file_id
+
+    def record(self, submission_id: str, send_type: str, sent: Any) -> None:
+        """
+        Records the file_id of a sent message, which may be a promise from the message queue.
+        """
+        key = (submission_id, send_type)
+        with self._lock:
+            if isinstance(sent, Promise):
+                self._unsent.append((key, sent))
+            else:
+                self._put(key, self._file_id(sent))
+            self._record_sent()
+
+    def invalidate(self, submission_id: str, send_type: str) -> None:
+        """
+        Forgets a file_id, for when telegram no longer accepts it.
+        """
+        key = (submission_id, send_type)
+        with self._lock:
+            self._record_sent()
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._record_sent()
+            return len(self._entries)
+
+    def _record_sent(self) -> None:
+        unsent = []
+        for key, promise in self._unsent:
+            if not promise.done.is_set():
+                unsent.append((key, promise))
+            elif promise.exception is None:
+                self._put(key, self._file_id(promise.result()))
+        self._unsent = unsent
+
+    def _put(self, key: Tuple[str, str], file_id: Optional[str]) -> None:
+        if file_id is None:
+            return
+        self._entries[key] = file_id
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _file_id(message) -> Optional[str]:
+        if message is None:
+            return None
+        if message.photo:
+            # Photos are sent back in a few sizes, the largest of which is the one sent
+            return message.photo[-1].file_id
+        if message.document:
+            return message.document.file_id
+        if message.audio:
+            return message.audio.file_id
+        return None
+
+    def save_to_json(self) -> None:
+        with self._lock:
+            self._record_sent()
+            data = [[submission_id, send_type, file_id] for (submission_id, send_type), file_id in self._entries.items()]
+        with open(self.FILENAME_TEMP, "w") as f:
+            json.dump(data, f)
+        os.replace(self.FILENAME_TEMP, self.FILENAME)
+
+    @staticmethod
+    def load_from_json(max_size: int) -> 'FileIdCache':
+        new_cache = FileIdCache(max_size)
+        try:
+            with open(FileIdCache.FILENAME, "r") as f:
+                data = json.load(f)
+            for submission_id, send_type, file_id in data:
+                new_cache._put((submission_id, send_type), file_id)
+        except FileNotFoundError:
+            pass
+        return new_cache
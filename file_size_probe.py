@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from single_flight import SingleFlight
+from ttl_cache import TTLCache
+
+
+class ProbeFailed(Exception):
+    pass
+
+
+class FileSizeProbe:
+    """
+    Finds the size of files with HEAD requests, made on a bounded pool of threads sharing one session.
+    Sizes are cached by URL, as files on FA do not change, and failures are cached for a short while, so a broken file
+    is not probed again for every subscriber. Connection errors and timeouts are not cached, as they are worth retrying
+    straight away, and are kept as the cause of the ProbeFailed raised for them.
+    Concurrent probes of the same URL are coalesced into one request.
+    """
+    WORKERS = 8
+    CACHE_SIZE = 10000
+    CACHE_TTL = 24 * 60 * 60
+    FAILURE_TTL = 60
+    TIMEOUT = 10
+    FAILED = -1
+
+    def __init__(self, workers: int = None):
+        if workers is None:
+            workers = self.WORKERS
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.sizes = TTLCache(self.CACHE_SIZE, self.CACHE_TTL)  # type: TTLCache[str, int]
+        self.flights = SingleFlight()  # type: SingleFlight[int]
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="size_probe")
+
+    def get_size(self, url: str) -> int:
+        return self.probe(url).result()
+
+    def probe(self, url: str) -> 'Future[int]':
+        """
+        Starts probing the size of a file, unless it is already known, and returns a future of it.
+        """
+        size = self.sizes.get(url)
+        if size is None:
+            return self._pool.submit(self.flights.do, url, lambda: self._probe_uncached(url))
+        future = Future()  # type: Future[int]
+        if size == self.FAILED:
+            future.set_exception(ProbeFailed(f"Recently failed to get the size of {url}"))
+        else:
+            future.set_result(size)
+        return future
+
+    def probe_many(self, urls: Iterable[str]) -> Dict[str, Optional[int]]:
+        """
+        Probes the sizes of a batch of files concurrently. Sizes which could not be found are None.
+        """
+        futures = {url: self.probe(url) for url in set(urls)}
+        sizes = dict()  # type: Dict[str, Optional[int]]
+        for url, future in futures.items():
+            try:
+                sizes[url] = future.result()
+            except ProbeFailed:
+                sizes[url] = None
+        return sizes
+
+    def _probe_uncached(self, url: str) -> int:
+        try:
+            resp = self.session.head(url, timeout=self.TIMEOUT)
+            if resp.status_code >= 400:
+                raise ProbeFailed(f"Got status {resp.status_code} when getting the size of {url}")
+            size = int(resp.headers['content-length'])
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise ProbeFailed(f"Failed to get the size of {url} because {e!r}") from e
+        except (requests.RequestException, KeyError, ValueError) as e:
+            self.sizes.put(url, self.FAILED, ttl=self.FAILURE_TTL)
+            raise ProbeFailed(f"Failed to get the size of {url} because {e!r}")
+        except ProbeFailed:
+            self.sizes.put(url, self.FAILED, ttl=self.FAILURE_TTL)
+            raise
+        self.sizes.put(url, size)
+        return size
@@ -1,5 +1,7 @@
+import threading
 import uuid
-from typing import Tuple, List, Union, Optional
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Tuple, List, Union, Optional, Callable, Set
 
 from telegram import InlineQueryResult, InlineQueryResultPhoto, InlineQueryResultArticle, InputTextMessageContent, \
     Update
@@ -7,13 +9,25 @@ from telegram.ext import InlineQueryHandler, CallbackContext
 
 from fa_export_api import FAExportAPI, PageNotFound
 from functionalities.functionalities import BotFunctionality
+from rate_limiter import Priority
+from ttl_cache import TTLCache
 
 
 class InlineFunctionality(BotFunctionality):
+    RESULT_CACHE_SIZE = 2000
+    # FA search only reindexes every 5 minutes
+    RESULT_CACHE_TTL = 300
+    PREFETCH_WORKERS = 4
 
     def __init__(self, api: FAExportAPI):
         super().__init__(InlineQueryHandler)
         self.api = api
+        self.result_cache = TTLCache(
+            self.RESULT_CACHE_SIZE, self.RESULT_CACHE_TTL
+        )  # type: TTLCache[Tuple[str, str, str], Tuple[List[InlineQueryResult], Union[int, str]]]
+        self.prefetch_pool = ThreadPoolExecutor(self.PREFETCH_WORKERS, thread_name_prefix="inline_prefetch")
+        self._prefetching = set()  # type: Set[Tuple[str, str, str]]
+        self._prefetching_lock = threading.Lock()
 
     def call(self, update: Update, context: CallbackContext):
         query = update.inline_query.query
@@ -26,16 +40,81 @@ class InlineFunctionality(BotFunctionality):
         # Get results and next offset
         if any(query_clean.startswith(x) for x in ["favourites:", "favs:", "favorites:"]):
             _, username = query_clean.split(":", 1)
-            results, next_offset = self._favs_query_results(username, offset)
+            cache_key = ("favs", username, offset)
+            results, next_offset = self._cached_results(
+                cache_key, lambda: self._favs_query_results(username, offset)
+            )
         else:
             gallery_query = self._parse_folder_and_username(query_clean)
             if gallery_query:
                 folder, username = gallery_query
-                results, next_offset = self._gallery_query_results(folder, username, offset)
+                cache_key = (folder, username, offset)
+                results, next_offset = self._cached_results(
+                    cache_key, lambda: self._gallery_query_results(folder, username, offset)
+                )
+                if next_offset != "":
+                    self._prefetch(
+                        (folder, username, str(next_offset)),
+                        lambda: self._gallery_query_results(folder, username, str(next_offset), Priority.BACKGROUND)
+                    )
             else:
-                results, next_offset = self._search_query_results(query, offset)
+                cache_key = ("search", query_clean, offset)
+                results, next_offset = self._cached_results(
+                    cache_key, lambda: self._search_query_results(query, offset)
+                )
+                if next_offset != "":
+                    self._prefetch(
+                        ("search", query_clean, str(next_offset)),
+                        lambda: self._search_query_results(query, str(next_offset), Priority.BACKGROUND)
+                    )
         # Send results
-        context.bot.answer_inline_query(update.inline_query.id, results, next_offset=next_offset)
+        context.bot.answer_inline_query(
+            update.inline_query.id, results, next_offset=next_offset, cache_time=self.RESULT_CACHE_TTL
+        )
+
+    def _cached_results(
+            self,
+            cache_key: Tuple[str, str, str],
+            get_results: Callable[[], Tuple[List[InlineQueryResult], Union[int, str]]]
+    ) -> Tuple[List[InlineQueryResult], Union[int, str]]:
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        # If the page is still being prefetched, it is fetched again now rather than waiting, as prefetches are in the
+        # background lane, which can be held up behind the subscription watcher
+        return self._fetch_results(cache_key, get_results)
+
+    def _fetch_results(
+            self,
+            cache_key: Tuple[str, str, str],
+            get_results: Callable[[], Tuple[List[InlineQueryResult], Union[int, str]]]
+    ) -> Tuple[List[InlineQueryResult], Union[int, str]]:
+        results = get_results()
+        self.result_cache.put(cache_key, results)
+        return results
+
+    def _prefetch(
+            self,
+            cache_key: Tuple[str, str, str],
+            get_results: Callable[[], Tuple[List[InlineQueryResult], Union[int, str]]]
+    ) -> Optional[Future]:
+        """
+        Users tend to scroll on to the next page quickly, so fetch it into the result cache in the background.
+        """
+        def prefetch():
+            try:
+                self._fetch_results(cache_key, get_results)
+            except Exception as e:
+                print(f"Failed to prefetch inline results for {cache_key} because {e}")
+            finally:
+                with self._prefetching_lock:
+                    self._prefetching.remove(cache_key)
+
+        with self._prefetching_lock:
+            if cache_key in self._prefetching or cache_key in self.result_cache:
+                return None
+            self._prefetching.add(cache_key)
+        return self.prefetch_pool.submit(prefetch)
 
     def _favs_query_results(self, username: str, offset: str) -> Tuple[List[InlineQueryResult], Union[int, str]]:
         if offset == "":
@@ -57,8 +136,9 @@ class InlineFunctionality(BotFunctionality):
         results = [x.to_inline_query_result() for x in submissions]
         return results, next_offset
 
-    def _gallery_query_results(self, folder: str, username: str, offset: str) \
-            -> Tuple[List[InlineQueryResult], Union[int, str]]:
+    def _gallery_query_results(
+            self, folder: str, username: str, offset: str, priority: Priority = Priority.INTERACTIVE
+    ) -> Tuple[List[InlineQueryResult], Union[int, str]]:
         # Parse offset to page and skip
         if offset == "":
             page, skip = 1, None
@@ -70,31 +150,34 @@ class InlineFunctionality(BotFunctionality):
         next_offset = page + 1
         # Try and get results
         try:
-            results = self._create_user_folder_results(username, folder, page)
+            submissions = self.api.get_user_folder(username, folder, page, priority)
         except PageNotFound:
             return self._user_not_found(username), ""
         # If no results, send error
-        if len(results) == 0:
+        if len(submissions) == 0:
             next_offset = ""
             if page == 1:
                 return self._empty_user_folder(username, folder), ""
-        # Handle paging of big result lists
+        # Handle paging of big result lists, before building results, so only the ones sent are built
         if skip:
-            results = results[skip:]
-        if len(results) > 48:
-            results = results[:48]
+            submissions = submissions[skip:]
+        if len(submissions) > 48:
+            submissions = submissions[:48]
             if skip:
                 skip += 48
             else:
                 skip = 48
             next_offset = f"{page}:{skip}"
+        results = [x.to_inline_query_result() for x in submissions]
         return results, next_offset
 
-    def _search_query_results(self, query: str, offset: str) -> Tuple[List[InlineQueryResult], Union[int, str]]:
+    def _search_query_results(
+            self, query: str, offset: str, priority: Priority = Priority.INTERACTIVE
+    ) -> Tuple[List[InlineQueryResult], Union[int, str]]:
         page = self._page_from_offset(offset)
         query_clean = query.strip().lower()
         next_offset = page + 1
-        results = self._create_inline_search_results(query_clean, page)
+        results = self._create_inline_search_results(query_clean, page, priority)
         if len(results) == 0:
             next_offset = ""
             if page == 1:
@@ -106,18 +189,13 @@ class InlineFunctionality(BotFunctionality):
             offset = 1
         return int(offset)
 
-    def _create_user_folder_results(self, username: str, folder: str, page: int) -> List[InlineQueryResultPhoto]:
-        return [
-            x.to_inline_query_result()
-            for x
-            in self.api.get_user_folder(username, folder, page)
-        ]
-
-    def _create_inline_search_results(self, query_clean: str, page: int) -> List[InlineQueryResultPhoto]:
+    def _create_inline_search_results(
+            self, query_clean: str, page: int, priority: Priority = Priority.INTERACTIVE
+    ) -> List[InlineQueryResultPhoto]:
         return [
             x.to_inline_query_result()
             for x
-            in self.api.get_search_results(query_clean, page)
+            in self.api.get_search_results(query_clean, page, priority)
         ]
 
     def _parse_folder_and_username(self, query_clean: str) -> Optional[Tuple[str, str]]:
@@ -7,6 +7,7 @@ from telegram.ext import MessageHandler, CallbackContext
 from filters import FilterRegex
 from fa_export_api import PageNotFound
 from fa_submission import FASubmissionFull, CantSendFileType, FASubmissionShort
+from file_id_cache import FileIdCache
 from functionalities.functionalities import BotFunctionality, in_progress_msg
 
 
@@ -16,9 +17,10 @@ class NeatenFunctionality(BotFunctionality):
     FA_THUMB_LINK = re.compile(r"t\.facdn\.net/([0-9]+)@[0-9]+-[0-9]+\.jpg")
     FA_LINKS = re.compile(f"({FA_SUB_LINK.pattern}|{FA_DIRECT_LINK.pattern}|{FA_THUMB_LINK.pattern})")
 
-    def __init__(self, api):
+    def __init__(self, api, file_id_cache: Optional[FileIdCache] = None):
         super().__init__(MessageHandler, filters=FilterRegex(self.FA_LINKS))
         self.api = api
+        self.file_id_cache = file_id_cache
 
     def call(self, update: Update, context: CallbackContext):
         message = update.message.text_markdown_urled or update.message.caption_markdown_urled
@@ -33,9 +35,11 @@ class NeatenFunctionality(BotFunctionality):
                     submission_ids.append(submission_id)
             # Remove duplicates, preserving order
             submission_ids = list(dict.fromkeys(submission_ids))
-            # Handle each submission
-            for submission_id in submission_ids:
-                self._handle_fa_submission_link(context.bot, update, submission_id)
+            # Fetch every submission first, so that each file size probe runs while the rest are fetched
+            submissions = [self._get_fa_submission(context.bot, update, sub_id) for sub_id in submission_ids]
+            for submission in submissions:
+                if submission is not None:
+                    self._send_neat_fa_response(context.bot, update, submission)
 
     def _get_submission_id_from_link(self, bot, update, link: str) -> Optional[int]:
         # Handle submission page link matches
@@ -58,18 +62,22 @@ class NeatenFunctionality(BotFunctionality):
             )
         return submission_id
 
-    def _handle_fa_submission_link(self, bot, update, submission_id: int):
+    def _get_fa_submission(self, bot, update, submission_id: int) -> Optional[FASubmissionFull]:
         print("Found a link, ID:{}".format(submission_id))
         try:
             submission = self.api.get_full_submission(str(submission_id))
-            self._send_neat_fa_response(bot, update, submission)
         except PageNotFound:
             self._return_error_in_privmsg(bot, update, "This doesn't seem to be a valid FA submission: "
                                                        "https://www.furaffinity.net/view/{}/".format(submission_id))
+            return None
+        submission.start_file_size_probe()
+        return submission
 
     def _send_neat_fa_response(self, bot, update, submission: FASubmissionFull):
         try:
-            submission.send_message(bot, update.message.chat_id, update.message.message_id)
+            submission.send_message(
+                bot, update.message.chat_id, update.message.message_id, file_id_cache=self.file_id_cache
+            )
         except CantSendFileType as e:
             self._return_error_in_privmsg(bot, update, str(e))
 
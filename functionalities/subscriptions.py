@@ -41,21 +41,20 @@ class SubscriptionFunctionality(BotFunctionality):
         if query == "":
             return f"Please specify the subscription query you wish to add."
         new_sub = Subscription(query, destination)
-        self.watcher.subscriptions.add(new_sub)
+        self.watcher.add_subscription(new_sub)
         return f"Added subscription: \"{query}\".\n{self._list_subs(destination)}"
 
     def _remove_sub(self, destination: int, query: str):
         old_sub = Subscription(query, destination)
         try:
-            self.watcher.subscriptions.remove(old_sub)
+            self.watcher.remove_subscription(old_sub)
             return f"Removed subscription: \"{query}\".\n{self._list_subs(destination)}"
         except KeyError:
             return f"There is not a subscription for \"{query}\" in this chat."
 
     def _list_subs(self, destination: int):
-        subs = [sub for sub in self.watcher.subscriptions if sub.destination == destination]
-        subs.sort(key=lambda sub: sub.query)
-        subs_list = "\n".join([f"- {sub.query}" for sub in subs])
+        queries = self.watcher.subscription_queries(destination)
+        subs_list = "\n".join([f"- {query}" for query in queries])
         return f"Current active subscriptions in this chat:\n{subs_list}"
 
 
@@ -101,12 +100,12 @@ class BlocklistFunctionality(BotFunctionality):
 
     def _remove_from_blocklist(self, destination: int, query: str):
         try:
-            self.watcher.blocklists[destination].remove(query)
+            self.watcher.remove_from_blocklist(destination, query)
             return f"Removed tag from blocklist: \"{query}\".\n{self._list_blocklisted_tags(destination)}"
         except KeyError:
             return f"The tag \"{query}\" is not on the blocklist for this chat."
 
     def _list_blocklisted_tags(self, destination: int):
-        blocklist = self.watcher.blocklists[destination]
+        blocklist = self.watcher.blocklist(destination)
         tags_list = "\n".join([f"- {tag}" for tag in blocklist])
         return f"Current blocklist for this chat:\n{tags_list}"
@@ -0,0 +1,102 @@
+import threading
+import time
+from enum import Enum
+from typing import Dict, Optional, Tuple
+
+
+class Priority(Enum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class TokenBucket:
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def time_until_available(self, tokens: float = 1) -> float:
+        if self.tokens >= tokens:
+            return 0
+        return (tokens - self.tokens) / self.rate
+
+
+class LaneStats:
+
+    def __init__(self):
+        self.count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float) -> None:
+        self.count += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    @property
+    def average_wait(self) -> float:
+        if self.count == 0:
+            return 0.0
+        return self.total_wait / self.count
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter shared between threads. Every request takes a token from the shared bucket, and
+    optionally from its lane's own bucket. While higher priority requests are waiting, lower priority requests do not
+    get a token.
+    """
+
+    def __init__(self, rate: float, burst: float, lane_limits: Dict[Priority, Tuple[float, float]] = None):
+        self.bucket = TokenBucket(rate, burst)
+        if lane_limits is None:
+            lane_limits = dict()
+        self.lane_buckets = {
+            priority: TokenBucket(lane_rate, lane_burst)
+            for priority, (lane_rate, lane_burst) in lane_limits.items()
+        }  # type: Dict[Priority, TokenBucket]
+        self.stats = {priority: LaneStats() for priority in Priority}  # type: Dict[Priority, LaneStats]
+        self._waiting = {priority: 0 for priority in Priority}  # type: Dict[Priority, int]
+        self._condition = threading.Condition()
+
+    def acquire(self, priority: Priority = Priority.INTERACTIVE) -> float:
+        """
+        Blocks until the request is allowed, returning how long it waited, in seconds.
+        """
+        start = time.monotonic()
+        lane_bucket = self.lane_buckets.get(priority)
+        with self._condition:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.bucket.refill(now)
+                    if lane_bucket is not None:
+                        lane_bucket.refill(now)
+                    wait = self._time_until_allowed(priority, lane_bucket)
+                    if wait == 0:
+                        self.bucket.tokens -= 1
+                        if lane_bucket is not None:
+                            lane_bucket.tokens -= 1
+                        break
+                    self._condition.wait(wait)
+            finally:
+                self._waiting[priority] -= 1
+                self._condition.notify_all()
+            waited = time.monotonic() - start
+            self.stats[priority].record(waited)
+        return waited
+
+    def _time_until_allowed(self, priority: Priority, lane_bucket: Optional[TokenBucket]) -> float:
+        # Leave enough tokens in the shared bucket for any higher priority requests which are waiting
+        higher_waiting = sum(self._waiting[other] for other in Priority if other.value < priority.value)
+        wait = self.bucket.time_until_available(higher_waiting + 1)
+        if lane_bucket is not None:
+            wait = max(wait, lane_bucket.time_until_available())
+        return wait
@@ -0,0 +1,119 @@
+import random
+import threading
+import time
+from typing import Optional
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class RetryPolicy:
+    """
+    How many times, and for how long, to retry a failed request.
+    Backoff is exponential with jitter, and a request is not retried if the retry would finish after the deadline.
+    """
+
+    MIN_REQUEST_TIMEOUT = 1
+
+    def __init__(self, max_retries: int, deadline: Optional[float], base_delay: float = 1, max_delay: float = 30):
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def start(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return time.monotonic() + self.deadline
+
+    def backoff(self, tries: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** tries)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    @staticmethod
+    def time_remaining(deadline_time: Optional[float]) -> Optional[float]:
+        if deadline_time is None:
+            return None
+        return max(deadline_time - time.monotonic(), 0)
+
+    def request_timeout(self, deadline_time: Optional[float]) -> Optional[float]:
+        remaining = self.time_remaining(deadline_time)
+        if remaining is None:
+            return None
+        return max(remaining, self.MIN_REQUEST_TIMEOUT)
+
+    def should_retry(self, tries: int, delay: float, deadline_time: Optional[float]) -> bool:
+        if tries >= self.max_retries:
+            return False
+        remaining = self.time_remaining(deadline_time)
+        return remaining is None or delay < remaining
+
+
+class RetryBudget:
+    """
+    Limits retries to a ratio of requests made, so that retries cannot multiply load while the API is struggling.
+    """
+
+    def __init__(self, ratio: float, capacity: float):
+        self.ratio = ratio
+        self.capacity = capacity
+        self.tokens = capacity
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    Opens after a number of consecutive failures, after which requests fail fast until the reset timeout has passed.
+    Then a single trial request is let through, and its result closes or re-opens the circuit. If the trial's result
+    is never recorded, another trial is let through once the reset timeout has passed again.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None  # type: Optional[float]
+        self.trial_started_at = None  # type: Optional[float]
+        self._lock = threading.Lock()
+
+    def check(self) -> None:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.trial_started_at = now
+                return
+            if self.state == self.HALF_OPEN and now - self.trial_started_at >= self.reset_timeout:
+                self.trial_started_at = now
+                return
+            raise CircuitOpen("FA API is unavailable, not sending requests for now.")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
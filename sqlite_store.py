@@ -0,0 +1,159 @@
+import datetime
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+import dateutil.parser
+
+
+class SQLiteStore:
+    """
+    Optional storage for the subscription watcher's state, in an SQLite database in WAL mode.
+    Every change is written as its own small transaction, and subscriptions and blocklists can be looked up by
+    destination without loading everything.
+    """
+    LATEST_IDS_KEPT = 15
+    DELIVERY_HISTORY_DAYS = 30
+    PRUNE_EVERY_DELIVERIES = 1000
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+        self._deliveries_since_prune = 0
+        self.prune_delivery_history()
+
+    def _create_tables(self) -> None:
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS subscriptions (
+                    destination INTEGER NOT NULL,
+                    query TEXT NOT NULL,
+                    latest_update TEXT,
+                    PRIMARY KEY (destination, query)
+                );
+                CREATE TABLE IF NOT EXISTS blocklists (
+                    destination INTEGER NOT NULL,
+                    tag TEXT NOT NULL,
+                    PRIMARY KEY (destination, tag)
+                );
+                CREATE TABLE IF NOT EXISTS latest_ids (
+                    position INTEGER PRIMARY KEY AUTOINCREMENT,
+                    submission_id TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS delivery_history (
+                    submission_id TEXT NOT NULL,
+                    destination INTEGER NOT NULL,
+                    query TEXT NOT NULL,
+                    sent_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS delivery_history_destination ON delivery_history (destination, sent_at);
+                CREATE INDEX IF NOT EXISTS delivery_history_sent_at ON delivery_history (sent_at);
+            """)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            for table in ["subscriptions", "blocklists", "latest_ids"]:
+                if self._conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is not None:
+                    return False
+            return True
+
+    def apply_change(self, change: Dict[str, Any]) -> None:
+        """
+        Writes one of the watcher's change records, as a single transaction.
+        """
+        with self._lock, self._conn:
+            if change["type"] == "latest_id":
+                self._conn.execute("INSERT INTO latest_ids (submission_id) VALUES (?)", (change["id"],))
+                self._conn.execute(
+                    "DELETE FROM latest_ids WHERE position <= (SELECT MAX(position) FROM latest_ids) - ?",
+                    (self.LATEST_IDS_KEPT,)
+                )
+            elif change["type"] == "add_subscription":
+                subscription = change["subscription"]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO subscriptions (destination, query, latest_update) VALUES (?, ?, ?)",
+                    (subscription["destination"], subscription["query"], subscription["latest_update"])
+                )
+            elif change["type"] == "remove_subscription":
+                self._conn.execute(
+                    "DELETE FROM subscriptions WHERE destination = ? AND query = ?",
+                    (change["destination"], change["query"])
+                )
+            elif change["type"] == "add_blocklist":
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO blocklists (destination, tag) VALUES (?, ?)",
+                    (change["destination"], change["tag"])
+                )
+            elif change["type"] == "remove_blocklist":
+                self._conn.execute(
+                    "DELETE FROM blocklists WHERE destination = ? AND tag = ?",
+                    (change["destination"], change["tag"])
+                )
+
+    def record_delivery(self, submission_id: str, destination: int, query: str, sent_at: datetime.datetime) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE subscriptions SET latest_update = ? WHERE destination = ? AND query = ?",
+                (sent_at.isoformat(), destination, query)
+            )
+            self._conn.execute(
+                "INSERT INTO delivery_history (submission_id, destination, query, sent_at) VALUES (?, ?, ?, ?)",
+                (submission_id, destination, query, sent_at.isoformat())
+            )
+            self._deliveries_since_prune += 1
+        if self._deliveries_since_prune >= self.PRUNE_EVERY_DELIVERIES:
+            self.prune_delivery_history()
+
+    def prune_delivery_history(self, now: Optional[datetime.datetime] = None) -> None:
+        """
+        Deletes deliveries older than the retention period, so the history does not grow forever.
+        Done when the store is opened, and again after every few deliveries.
+        """
+        if now is None:
+            now = datetime.datetime.now()
+        cutoff = now - datetime.timedelta(days=self.DELIVERY_HISTORY_DAYS)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM delivery_history WHERE sent_at < ?", (cutoff.isoformat(),))
+            self._deliveries_since_prune = 0
+
+    def load_latest_ids(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT submission_id FROM latest_ids ORDER BY position").fetchall()
+        return [row[0] for row in rows]
+
+    def load_subscriptions(self) -> List[Tuple[str, int, Optional[datetime.datetime]]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT query, destination, latest_update FROM subscriptions").fetchall()
+        return [
+            (query, destination, None if latest_update is None else dateutil.parser.parse(latest_update))
+            for query, destination, latest_update in rows
+        ]
+
+    def load_blocklists(self) -> Dict[int, Set[str]]:
+        blocklists = dict()  # type: Dict[int, Set[str]]
+        with self._lock:
+            rows = self._conn.execute("SELECT destination, tag FROM blocklists").fetchall()
+        for destination, tag in rows:
+            blocklists.setdefault(destination, set()).add(tag)
+        return blocklists
+
+    def blocklist(self, destination: int) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT tag FROM blocklists WHERE destination = ?", (destination,)).fetchall()
+        return set(row[0] for row in rows)
+
+    def deliveries(self, destination: int) -> List[Tuple[str, str, datetime.datetime]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT submission_id, query, sent_at FROM delivery_history WHERE destination = ? ORDER BY sent_at",
+                (destination,)
+            ).fetchall()
+        return [(submission_id, query, dateutil.parser.parse(sent_at)) for submission_id, query, sent_at in rows]
@@ -0,0 +1,50 @@
+from typing import Dict, List, Optional, Sequence, Union, overload
+
+from fa_submission import FASubmission, FASubmissionShort
+
+
+class SubmissionPage(Sequence[FASubmissionShort]):
+    """
+    A page of results from the API, where each submission is only built the first time it is used.
+    Submission IDs can be read without building any submissions.
+    """
+
+    def __init__(self, data: List[Dict[str, str]]):
+        self._data = data
+        self._submissions = [None] * len(data)  # type: List[Optional[FASubmissionShort]]
+
+    @property
+    def submission_ids(self) -> List[str]:
+        return [submission_data['id'] for submission_data in self._data]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @overload
+    def __getitem__(self, index: int) -> FASubmissionShort:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[FASubmissionShort]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[FASubmissionShort, List[FASubmissionShort]]:
+        if isinstance(index, slice):
+            return [self._submission(num) for num in range(*index.indices(len(self._data)))]
+        if index < 0:
+            index += len(self._data)
+        if not 0 <= index < len(self._data):
+            raise IndexError("Submission page index out of range")
+        return self._submission(index)
+
+    def _submission(self, index: int) -> FASubmissionShort:
+        submission = self._submissions[index]
+        if submission is None:
+            submission = FASubmission.from_short_dict(self._data[index])
+            self._submissions[index] = submission
+        return submission
+
+    def __eq__(self, other):
+        if not isinstance(other, (SubmissionPage, list)):
+            return False
+        return list(self) == list(other)
@@ -2,16 +2,24 @@ import collections
 import datetime
 import json
 import os
-import re
-import string
+import threading
 import time
-from typing import List, Optional, Deque, Set, Dict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, Optional, Deque, Set, Dict, Iterable, FrozenSet, NamedTuple, Iterator, Tuple, Any, Union
 import dateutil.parser
 import telegram
 import heartbeat
 
+from delivery_queue import DeliveryQueue, DeliveryJob, wait_until_sent
 from fa_export_api import FAExportAPI
+from file_id_cache import FileIdCache
 from fa_submission import FASubmissionFull, FASubmissionShort, Rating
+from rate_limiter import Priority
+from retry_policy import CircuitOpen
+from sqlite_store import SQLiteStore
+from submission_page import SubmissionPage
+from update_batcher import UpdateBatcher, PendingUpdate, update_prefix
+from write_ahead_log import WriteAheadLog
 
 heartbeat.heartbeat_app_url = "https://heartbeat.spangle.org.uk/"
 heartbeat_app_name = "FASearchBot_sub_thread"
@@ -31,16 +39,29 @@ class SubscriptionWatcher:
     BACK_OFF = 20
     BROWSE_RETRY_BACKOFF = 20
     UPDATE_PER_HEARTBEAT = 10
+    FETCH_WORKERS = 8
+    FETCH_AHEAD = 32
+    DELIVERY_WORKERS = 4
     FILENAME = "subscriptions.json"
     FILENAME_TEMP = "subscriptions.temp.json"
+    COMPACT_AFTER_CHANGES = 1000
+    FILE_ID_SAVE_INTERVAL = 600
 
-    def __init__(self, api: FAExportAPI, bot: telegram.Bot):
+    def __init__(self, api: FAExportAPI, bot: telegram.Bot, store: Optional[SQLiteStore] = None):
         self.api = api
         self.bot = bot
         self.latest_ids = collections.deque(maxlen=15)  # type: Deque[str]
         self.running = False
-        self.subscriptions = set()  # type: Set[Subscription]
+        self.subscriptions = SubscriptionRegistry()
+        self._index = None  # type: Optional[SubscriptionIndex]
+        self._index_version = None  # type: Optional[int]
         self.blocklists = dict()  # type: Dict[int, Set[str]]
+        self.delivery_queue = DeliveryQueue(self.DELIVERY_WORKERS)
+        self.change_log = WriteAheadLog(os.path.splitext(self.FILENAME)[0] + ".log.jsonl")
+        self.store = store
+        self.batcher = None  # type: Optional[UpdateBatcher]
+        self.file_id_cache = None  # type: Optional[FileIdCache]
+        self._file_ids_saved_at = time.monotonic()
 
     """
     This method is launched as a separate thread, it reads the browse endpoint for new submissions, and checks if they 
@@ -48,6 +69,7 @@ class SubscriptionWatcher:
     """
     def run(self):
         self.running = True
+        self.delivery_queue.start()
         while self.running:
             try:
                 new_results = self._get_new_results()
@@ -56,37 +78,99 @@ class SubscriptionWatcher:
                 continue
             count = 0
             heartbeat.update_heartbeat(heartbeat_app_name)
+            index = self._subscription_index()
+            blocklists = self._compiled_blocklists()
             # Check for subscription updates
-            for result in new_results:
+            for result, full_future in self._fetch_full_results(new_results):
                 count += 1
                 # Try and get the full data
                 try:
-                    full_result = self.api.get_full_submission(result.submission_id)
+                    full_result = full_future.result()
+                except CircuitOpen as e:
+                    # Leave the rest of the results for the next check, rather than skipping them
+                    print(f"Stopped checking new results because {e}")
+                    break
                 except Exception:
                     print(f"Submission {result.submission_id} disappeared before I could check it.")
                     continue
-                # Copy subscriptions, to avoid "changed size during iteration" issues
-                subscriptions = self.subscriptions.copy()
-                # Check which subscriptions match
-                for subscription in subscriptions:
-                    blocklist = self.blocklists.get(subscription.destination, set())
+                # Check which subscriptions match, starting from the ones which could possibly match
+                matches = dict()  # type: Dict[int, List[Subscription]]
+                for subscription in index.candidates(full_result):
+                    blocklist = blocklists.get(subscription.destination, EMPTY_BLOCKLIST)
                     if subscription.matches_result(full_result, blocklist):
-                        try:
-                            self._send_update(subscription, full_result)
-                        except Exception as e:
-                            print(f"Failed to send submission: {full_result.submission_id} "
-                                  f"to {subscription.destination} because {e}.")
+                        matches.setdefault(subscription.destination, []).append(subscription)
+                # Send each destination one update, however many of its subscriptions matched
+                if matches and (self.batcher is None or self.batcher.mode == UpdateBatcher.ALBUM):
+                    # Digests only send links, so don't need the file size
+                    full_result.start_file_size_probe()
+                for subscriptions in matches.values():
+                    self._queue_update(subscriptions, full_result)
                 # Update latest ids with the submission we just checked, and save config
                 self._update_latest_ids([result])
+                self._flush_batches()
                 # If we've done ten, update heartbeat
                 if count % self.UPDATE_PER_HEARTBEAT == 0:
                     heartbeat.update_heartbeat(heartbeat_app_name)
+            self._flush_batches()
+            self._save_file_ids()
             # Wait
             self._wait_while_running(self.BACK_OFF)
+        self._flush_batches(flush_all=True)
+        self.delivery_queue.stop()
+        if self.store is None:
+            self.save_to_json()
 
     def stop(self):
         self.running = False
 
+    def _save_file_ids(self):
+        # Saved every so often, so that a crash does not lose every file_id since the bot started
+        if self.file_id_cache is None or time.monotonic() - self._file_ids_saved_at < self.FILE_ID_SAVE_INTERVAL:
+            return
+        try:
+            self.file_id_cache.save_to_json()
+        except Exception as e:
+            print(f"Failed to save file_id cache because {e}")
+        self._file_ids_saved_at = time.monotonic()
+
+    def _subscription_index(self) -> 'SubscriptionIndex':
+        """
+        Returns an index of the current subscriptions, only rebuilding it when they have changed.
+        """
+        snapshot = self.subscriptions.snapshot()
+        if self._index is None or self._index_version != snapshot.version:
+            self._index = SubscriptionIndex(snapshot.subscriptions)
+            self._index_version = snapshot.version
+        return self._index
+
+    def _compiled_blocklists(self) -> Dict[int, 'CompiledBlocklist']:
+        return {
+            destination: CompiledBlocklist.from_tags(frozenset(tags))
+            for destination, tags in list(self.blocklists.items())
+        }
+
+    def _fetch_full_results(
+            self, new_results: List[FASubmissionShort]
+    ) -> Iterator[Tuple[FASubmissionShort, 'Future[FASubmissionFull]']]:
+        """
+        Fetches full submission data for new results concurrently, a limited number ahead of the one being checked,
+        but yields them in the same order as the new results.
+        """
+        with ThreadPoolExecutor(self.FETCH_WORKERS, thread_name_prefix="watcher_fetch") as pool:
+            pending = collections.deque()  # type: Deque[Tuple[FASubmissionShort, Future]]
+            try:
+                for result in new_results:
+                    future = pool.submit(self.api.get_full_submission, result.submission_id, Priority.BACKGROUND)
+                    pending.append((result, future))
+                    if len(pending) >= self.FETCH_AHEAD:
+                        yield pending.popleft()
+                while pending:
+                    yield pending.popleft()
+            finally:
+                # If checking stopped early, don't fetch the rest
+                for _, future in pending:
+                    future.cancel()
+
     def _wait_while_running(self, seconds):
         sleep_end = datetime.datetime.now() + datetime.timedelta(seconds=seconds)
         while datetime.datetime.now() < sleep_end:
@@ -94,11 +178,11 @@ class SubscriptionWatcher:
                 break
             time.sleep(0.1)
 
-    def _get_browse_page(self, page: int = 1) -> List[FASubmissionShort]:
+    def _get_browse_page(self, page: int = 1) -> SubmissionPage:
         while self.running:
             try:
-                return self.api.get_browse_page(page)
-            except ValueError as e:
+                return self.api.get_browse_page(page, Priority.BACKGROUND)
+            except (ValueError, CircuitOpen) as e:
                 self._wait_while_running(self.BROWSE_RETRY_BACKOFF)
 
     def _get_new_results(self) -> List[FASubmissionShort]:
@@ -110,18 +194,16 @@ class SubscriptionWatcher:
             self._update_latest_ids(first_page[::-1])
             return []
         page = 1
-        browse_results = []  # type: List[FASubmissionShort]
         new_results = []  # type: List[FASubmissionShort]
         caught_up = False
         while page <= self.PAGE_CAP and not caught_up:
             page_results = self._get_browse_page(page)
-            browse_results += page_results
-            # Get new results
-            for result in page_results:
-                if result.submission_id in self.latest_ids:
+            # Get new results, only building the submissions which are new
+            for index, submission_id in enumerate(page_results.submission_ids):
+                if submission_id in self.latest_ids:
                     caught_up = True
                     break
-                new_results.append(result)
+                new_results.append(page_results[index])
             page += 1
         # Return oldest result first
         return new_results[::-1]
@@ -129,20 +211,130 @@ class SubscriptionWatcher:
     def _update_latest_ids(self, browse_results: List[FASubmissionShort]):
         for result in browse_results:
             self.latest_ids.append(result.submission_id)
-        self.save_to_json()
+            self._log_change({"type": "latest_id", "id": result.submission_id})
+
+    def _queue_update(self, subscriptions: List['Subscription'], result: FASubmissionFull):
+        destination = subscriptions[0].destination
+        if self.batcher is not None:
+            self.batcher.add(destination, PendingUpdate(subscriptions, result))
+            return
+        self.delivery_queue.put(DeliveryJob(
+            destination,
+            lambda: self._send_update(subscriptions, result),
+            f"submission: {result.submission_id}"
+        ))
+
+    def _flush_batches(self, flush_all: bool = False):
+        if self.batcher is None:
+            return
+        batches = self.batcher.flush_all() if flush_all else self.batcher.due()
+        for destination, updates in batches:
+            # Each part is its own job, so a failed part is retried without sending the others again
+            for num, part in enumerate(self.batcher.split(updates)):
+                self.delivery_queue.put(DeliveryJob(
+                    destination,
+                    lambda batch_destination=destination, batch=part, continued=num > 0:
+                        self._send_batch(batch_destination, batch, continued),
+                    f"{len(part)} submissions"
+                ))
 
-    def _send_update(self, subscription: 'Subscription', result: FASubmissionFull):
-        subscription.latest_update = datetime.datetime.now()
-        result.send_message(self.bot, subscription.destination, prefix=f"Update on \"{subscription.query}\" subscription:")
+    def _send_batch(self, destination: int, updates: List[PendingUpdate], continued: bool = False):
+        # Find out all the file sizes at once, rather than one at a time while sending. Digests only send links.
+        if self.batcher.mode == UpdateBatcher.ALBUM:
+            FASubmissionFull.fetch_file_sizes([update.result for update in updates])
+        self.batcher.send_part(self.bot, destination, updates, self.file_id_cache, continued)
+        for update in updates:
+            self._record_delivery(update.subscriptions, update.result)
+
+    def _send_update(self, subscriptions: List['Subscription'], result: FASubmissionFull):
+        wait_until_sent(result.send_message(
+            self.bot, subscriptions[0].destination, prefix=update_prefix(subscriptions), file_id_cache=self.file_id_cache
+        ))
+        self._record_delivery(subscriptions, result)
+
+    def _record_delivery(self, subscriptions: List['Subscription'], result: FASubmissionFull):
+        for subscription in subscriptions:
+            subscription.latest_update = datetime.datetime.now()
+            if self.store is not None:
+                self.store.record_delivery(
+                    result.submission_id, subscription.destination, subscription.query, subscription.latest_update
+                )
+            else:
+                self._log_change({
+                    "type": "subscription_update",
+                    "query": subscription.query,
+                    "destination": subscription.destination,
+                    "latest_update": subscription.latest_update.isoformat()
+                })
+
+    def add_subscription(self, subscription: 'Subscription'):
+        self.subscriptions.add(subscription)
+        self._log_change({"type": "add_subscription", "subscription": subscription.to_json()})
+
+    def remove_subscription(self, subscription: 'Subscription'):
+        self.subscriptions.remove(subscription)
+        self._log_change({
+            "type": "remove_subscription",
+            "query": subscription.query,
+            "destination": subscription.destination
+        })
 
     def add_to_blocklist(self, destination: int, tag: str):
         if destination in self.blocklists:
             self.blocklists[destination].add(tag)
         else:
             self.blocklists[destination] = {tag}
+        self._log_change({"type": "add_blocklist", "destination": destination, "tag": tag})
+
+    def remove_from_blocklist(self, destination: int, tag: str):
+        self.blocklists[destination].remove(tag)
+        self._log_change({"type": "remove_blocklist", "destination": destination, "tag": tag})
+
+    def subscription_queries(self, destination: int) -> List[str]:
+        return sorted(sub.query for sub in self.subscriptions.for_destination(destination))
+
+    def blocklist(self, destination: int) -> Set[str]:
+        if self.store is not None:
+            return self.store.blocklist(destination)
+        return self.blocklists.get(destination, set())
+
+    def _log_change(self, change: Dict[str, Any]):
+        if self.store is not None:
+            self.store.apply_change(change)
+            return
+        self.change_log.append(change)
+        if self.change_log.entries >= self.COMPACT_AFTER_CHANGES:
+            self.save_to_json()
+
+    def _apply_change(self, change: Dict[str, Any], subscriptions: Dict[Tuple[str, int], 'Subscription']):
+        """
+        Applies a change read back from the change log. Changes may already be in the saved snapshot, so applying
+        them must have the same result either way.
+        Subscription changes are applied to a plain dict, keyed by query and destination, which the registry is built
+        from once they are all replayed.
+        """
+        if change["type"] == "latest_id":
+            if change["id"] not in self.latest_ids:
+                self.latest_ids.append(change["id"])
+        elif change["type"] == "add_subscription":
+            subscription = Subscription.from_json(change["subscription"])
+            subscriptions.setdefault((subscription.query, subscription.destination), subscription)
+        elif change["type"] == "remove_subscription":
+            subscriptions.pop((change["query"], change["destination"]), None)
+        elif change["type"] == "subscription_update":
+            subscription = subscriptions.get((change["query"], change["destination"]))
+            if subscription is not None:
+                subscription.latest_update = dateutil.parser.parse(change["latest_update"])
+        elif change["type"] == "add_blocklist":
+            self.blocklists.setdefault(change["destination"], set()).add(change["tag"])
+        elif change["type"] == "remove_blocklist":
+            self.blocklists.get(change["destination"], set()).discard(change["tag"])
 
     def save_to_json(self):
-        subscriptions = self.subscriptions.copy()
+        self.change_log.compact(self._write_snapshot)
+
+    def _write_snapshot(self):
+        subscriptions = self.subscriptions.snapshot().subscriptions
         data = {
             "latest_ids": list(self.latest_ids),
             "subscriptions": [x.to_json() for x in subscriptions],
@@ -154,67 +346,254 @@ class SubscriptionWatcher:
 
     @staticmethod
     def load_from_json(api: FAExportAPI, bot: telegram.Bot) -> 'SubscriptionWatcher':
+        new_watcher = SubscriptionWatcher(api, bot)
+        subscriptions = dict()  # type: Dict[Tuple[str, int], Subscription]
         try:
             with open(SubscriptionWatcher.FILENAME, "r") as f:
                 data = json.load(f)
+            for old_id in data["latest_ids"]:
+                new_watcher.latest_ids.append(old_id)
+            for saved_sub in data["subscriptions"]:
+                subscription = Subscription.from_json(saved_sub)
+                subscriptions[(subscription.query, subscription.destination)] = subscription
+            new_watcher.blocklists = {int(k): set(v) for k, v in data["blacklists"].items()}
         except FileNotFoundError:
-            return SubscriptionWatcher(api, bot)
-        new_watcher = SubscriptionWatcher(api, bot)
-        for old_id in data["latest_ids"]:
+            pass
+        # Replay any changes made since the snapshot was saved, then save them into a fresh snapshot
+        replayed = 0
+        for change in new_watcher.change_log.read():
+            new_watcher._apply_change(change, subscriptions)
+            replayed += 1
+        # Built in one go, as adding to the registry one at a time copies it every time
+        new_watcher.subscriptions = SubscriptionRegistry(subscriptions.values())
+        if replayed:
+            new_watcher.save_to_json()
+        return new_watcher
+
+    @staticmethod
+    def load_from_sqlite(api: FAExportAPI, bot: telegram.Bot, filename: str) -> 'SubscriptionWatcher':
+        store = SQLiteStore(filename)
+        if store.is_empty():
+            # Bring across anything saved by the JSON backend
+            old_watcher = SubscriptionWatcher.load_from_json(api, bot)
+            for change in old_watcher._state_as_changes():
+                store.apply_change(change)
+        new_watcher = SubscriptionWatcher(api, bot, store)
+        for old_id in store.load_latest_ids():
             new_watcher.latest_ids.append(old_id)
-        new_watcher.subscriptions = set(Subscription.from_json(x) for x in data["subscriptions"])
-        new_watcher.blocklists = {int(k): set(v) for k, v in data["blacklists"].items()}
+        subscriptions = []
+        for query, destination, latest_update in store.load_subscriptions():
+            subscription = Subscription(query, destination)
+            subscription.latest_update = latest_update
+            subscriptions.append(subscription)
+        new_watcher.subscriptions = SubscriptionRegistry(subscriptions)
+        new_watcher.blocklists = store.load_blocklists()
         return new_watcher
 
+    def _state_as_changes(self) -> Iterator[Dict[str, Any]]:
+        for old_id in self.latest_ids:
+            yield {"type": "latest_id", "id": old_id}
+        for subscription in self.subscriptions:
+            yield {"type": "add_subscription", "subscription": subscription.to_json()}
+        for destination, tags in self.blocklists.items():
+            for tag in tags:
+                yield {"type": "add_blocklist", "destination": destination, "tag": tag}
+
+
+class SubscriptionIndex:
+    """
+    Maps query words to the subscriptions which require them, so that each submission is only checked against
+    subscriptions which could match it.
+    Each subscription is indexed by one of its positive words, as it cannot match a submission without that word.
+    Subscriptions with no positive words are candidates for every submission.
+    """
+
+    def __init__(self, subscriptions: Iterable['Subscription']):
+        self.by_word = dict()  # type: Dict[str, List[Subscription]]
+        self.unindexed = []  # type: List[Subscription]
+        for subscription in subscriptions:
+            self.add(subscription)
+
+    def add(self, subscription: 'Subscription') -> None:
+        positive_words = subscription.compiled_query.positive_words
+        if not positive_words:
+            self.unindexed.append(subscription)
+            return
+        # Longer words are likely to be rarer, and so select fewer submissions
+        index_word = max(positive_words, key=len)
+        self.by_word.setdefault(index_word, []).append(subscription)
+
+    def candidates(self, result: FASubmissionFull) -> List['Subscription']:
+        candidates = list(self.unindexed)
+        for word in result.words:
+            candidates += self.by_word.get(word, [])
+        return candidates
+
+
+class SubscriptionSnapshot(NamedTuple):
+    version: int
+    subscriptions: FrozenSet['Subscription']
+    by_destination: Dict[int, FrozenSet['Subscription']]
+
+
+class SubscriptionRegistry:
+    """
+    Set of subscriptions, which also keeps them indexed by destination, so that one chat's subscriptions can be found
+    without going through everyone's.
+    Changes are made under a lock, and each one publishes a new immutable snapshot with a higher version, so readers
+    never need a lock or a copy, and can tell when anything has changed.
+    """
+
+    def __init__(self, subscriptions: Iterable['Subscription'] = ()):
+        self._lock = threading.Lock()
+        subscriptions = frozenset(subscriptions)
+        by_destination = dict()  # type: Dict[int, Set[Subscription]]
+        for subscription in subscriptions:
+            by_destination.setdefault(subscription.destination, set()).add(subscription)
+        self._snapshot = SubscriptionSnapshot(
+            0, subscriptions, {destination: frozenset(subs) for destination, subs in by_destination.items()}
+        )
+
+    def snapshot(self) -> SubscriptionSnapshot:
+        return self._snapshot
+
+    def add(self, subscription: 'Subscription') -> None:
+        with self._lock:
+            if subscription in self._snapshot.subscriptions:
+                return
+            destination_subscriptions = self._snapshot.by_destination.get(subscription.destination, frozenset())
+            self._publish(
+                self._snapshot.subscriptions | {subscription},
+                subscription.destination,
+                destination_subscriptions | {subscription}
+            )
+
+    def remove(self, subscription: 'Subscription') -> None:
+        with self._lock:
+            if subscription not in self._snapshot.subscriptions:
+                raise KeyError(subscription)
+            destination_subscriptions = self._snapshot.by_destination[subscription.destination]
+            self._publish(
+                self._snapshot.subscriptions - {subscription},
+                subscription.destination,
+                destination_subscriptions - {subscription}
+            )
+
+    def discard(self, subscription: 'Subscription') -> None:
+        try:
+            self.remove(subscription)
+        except KeyError:
+            pass
+
+    def _publish(
+            self,
+            subscriptions: FrozenSet['Subscription'],
+            destination: int,
+            destination_subscriptions: FrozenSet['Subscription']
+    ) -> None:
+        by_destination = dict(self._snapshot.by_destination)
+        if destination_subscriptions:
+            by_destination[destination] = destination_subscriptions
+        else:
+            by_destination.pop(destination, None)
+        self._snapshot = SubscriptionSnapshot(self._snapshot.version + 1, subscriptions, by_destination)
+
+    def for_destination(self, destination: int) -> FrozenSet['Subscription']:
+        return self._snapshot.by_destination.get(destination, frozenset())
+
+    def copy(self) -> Set['Subscription']:
+        return set(self._snapshot.subscriptions)
+
+    def __iter__(self) -> Iterator['Subscription']:
+        return iter(self._snapshot.subscriptions)
+
+    def __len__(self) -> int:
+        return len(self._snapshot.subscriptions)
+
+    def __contains__(self, subscription: 'Subscription') -> bool:
+        return subscription in self._snapshot.subscriptions
+
+    def __eq__(self, other):
+        if isinstance(other, SubscriptionRegistry):
+            other = other.snapshot().subscriptions
+        return self._snapshot.subscriptions == other
+
+
+class CompiledQuery(NamedTuple):
+    positive_words: FrozenSet[str]
+    negative_words: FrozenSet[str]
+    allowed_ratings: FrozenSet[Rating]
+
+    @staticmethod
+    def from_query(query: str) -> 'CompiledQuery':
+        positive_words = set()
+        negative_words = set()
+        allowed_ratings = {Rating.GENERAL, Rating.MATURE, Rating.ADULT}
+        positive_ratings = []
+        negative_ratings = []
+        for word in query.lower().split():
+            if word[0] == "-":
+                if word[1:].startswith("rating:"):
+                    negative_ratings.append(word[1:])
+                else:
+                    negative_words.add(word[1:])
+            else:
+                if word.startswith("rating:"):
+                    positive_ratings.append(word)
+                else:
+                    positive_words.add(word)
+        # Check if rating is specified
+        for word in positive_ratings:
+            rating = rating_dict.get(word.split(":")[1])
+            if rating is not None:
+                allowed_ratings = {rating}
+        for word in negative_ratings:
+            rating = rating_dict.get(word.split(":")[1])
+            if rating is not None:
+                allowed_ratings.discard(rating)
+        return CompiledQuery(frozenset(positive_words), frozenset(negative_words), frozenset(allowed_ratings))
+
+
+class CompiledBlocklist(NamedTuple):
+    words: FrozenSet[str]
+    blocked_ratings: FrozenSet[Rating]
+
+    @staticmethod
+    def from_tags(tags: Iterable[str]) -> 'CompiledBlocklist':
+        words = set()
+        blocked_ratings = set()
+        for tag in tags:
+            if tag.startswith("rating:"):
+                rating = rating_dict.get(tag.split(":")[1])
+                if rating is not None:
+                    blocked_ratings.add(rating)
+            else:
+                words.add(tag)
+        return CompiledBlocklist(frozenset(words), frozenset(blocked_ratings))
+
+
+EMPTY_BLOCKLIST = CompiledBlocklist(frozenset(), frozenset())
+
 
 class Subscription:
+    __slots__ = ("query", "destination", "latest_update", "compiled_query")
 
     def __init__(self, query: str, destination: int):
         self.query = query
         self.destination = destination
         self.latest_update = None  # type: Optional[datetime.datetime]
+        self.compiled_query = CompiledQuery.from_query(query)
 
-    def matches_result(self, result: FASubmissionFull, blocklist: Set[str]) -> bool:
-        query_words = self.query.lower().split()
-        all_text = \
-            self._split_text_to_words(result.title) + \
-            self._split_text_to_words(result.description) + \
-            result.keywords
-        positive_words = [x for x in query_words if x[0] != "-"]
-        negative_words = [x[1:] for x in query_words if x[0] == "-"]
-        negative_words += list(blocklist)
-        # Check if rating is specified
-        allowed_ratings = [Rating.GENERAL, Rating.MATURE, Rating.ADULT]
-        for word in positive_words[:]:
-            if word.startswith("rating:"):
-                positive_words.remove(word)
-                rating = rating_dict.get(word.split(":")[1])
-                if rating is not None:
-                    allowed_ratings = [rating]
-        for word in negative_words[:]:
-            if word.startswith("rating:"):
-                negative_words.remove(word)
-                rating = rating_dict.get(word.split(":")[1])
-                if rating is not None:
-                    allowed_ratings.remove(rating)
-        return all(
-            [
-                self._query_word_matches_text(word, all_text)
-                for word in positive_words
-            ]
-        ) and not any(
-            [
-                self._query_word_matches_text(word, all_text)
-                for word in negative_words
-            ]
-        ) and result.rating in allowed_ratings
-    
-    def _split_text_to_words(self, text: str) -> List[str]:
-        return re.split(r"[\s\"<>]+", text)
-
-    def _query_word_matches_text(self, query_word: str, text: List[str]) -> bool:
-        clean_list = [x.lower().strip(string.punctuation) for x in text]
-        return query_word in clean_list
+    def matches_result(self, result: FASubmissionFull, blocklist: Union[Set[str], CompiledBlocklist]) -> bool:
+        if not isinstance(blocklist, CompiledBlocklist):
+            blocklist = CompiledBlocklist.from_tags(blocklist)
+        compiled = self.compiled_query
+        if result.rating not in compiled.allowed_ratings or result.rating in blocklist.blocked_ratings:
+            return False
+        words = result.words
+        return compiled.positive_words.issubset(words) \
+            and compiled.negative_words.isdisjoint(words) \
+            and words.isdisjoint(blocklist.words)
 
     def to_json(self):
         latest_update_str = None
@@ -0,0 +1,73 @@
+from functionalities.inline import InlineFunctionality
+from tests.util.mock_export_api import MockExportAPI, MockSubmission
+from tests.util.mock_method import MockMethod
+from tests.util.mock_telegram_update import MockTelegramUpdate
+
+
+def test_search_results_cached(context):
+    submission = MockSubmission(234563)
+    inline = InlineFunctionality(MockExportAPI())
+    inline._prefetch = MockMethod().call
+    inline.api.with_search_results("ych", [submission])
+    inline.call(MockTelegramUpdate.with_inline_query(query="YCH"), context)
+    get_search_results = MockMethod([])
+    inline.api.get_search_results = get_search_results.call
+
+    inline.call(MockTelegramUpdate.with_inline_query(query="  ych "), context)
+
+    assert not get_search_results.called
+    assert context.bot.answer_inline_query.call_count == 2
+    args = context.bot.answer_inline_query.call_args[0]
+    assert len(args[1]) == 1
+    assert args[1][0].id == submission.submission_id
+    assert context.bot.answer_inline_query.call_args[1]['next_offset'] == 2
+    assert context.bot.answer_inline_query.call_args[1]['cache_time'] == InlineFunctionality.RESULT_CACHE_TTL
+
+
+def test_cache_keyed_by_offset(context):
+    submission1 = MockSubmission(234563)
+    submission2 = MockSubmission(234564)
+    inline = InlineFunctionality(MockExportAPI())
+    inline._prefetch = MockMethod().call
+    inline.api.with_search_results("ych", [submission1], page=1)
+    inline.api.with_search_results("ych", [submission2], page=2)
+
+    inline.call(MockTelegramUpdate.with_inline_query(query="ych"), context)
+    inline.call(MockTelegramUpdate.with_inline_query(query="ych", offset="2"), context)
+
+    args = context.bot.answer_inline_query.call_args[0]
+    assert len(args[1]) == 1
+    assert args[1][0].id == submission2.submission_id
+    assert len(inline.result_cache) == 2
+
+
+def test_cache_keyed_by_query_type(context):
+    gallery_submission = MockSubmission(234563)
+    scraps_submission = MockSubmission(234564)
+    inline = InlineFunctionality(MockExportAPI())
+    inline._prefetch = MockMethod().call
+    inline.api.with_user_folder("fender", "gallery", [gallery_submission])
+    inline.api.with_user_folder("fender", "scraps", [scraps_submission])
+
+    inline.call(MockTelegramUpdate.with_inline_query(query="gallery:fender"), context)
+    inline.call(MockTelegramUpdate.with_inline_query(query="scraps:fender"), context)
+
+    args = context.bot.answer_inline_query.call_args[0]
+    assert len(args[1]) == 1
+    assert args[1][0].id == scraps_submission.submission_id
+
+
+def test_favs_results_cached(context):
+    submission = MockSubmission(234563)
+    inline = InlineFunctionality(MockExportAPI())
+    inline._prefetch = MockMethod().call
+    inline.api.with_user_favs("fender", [submission])
+    inline.call(MockTelegramUpdate.with_inline_query(query="favs:fender"), context)
+    get_user_favs = MockMethod([])
+    inline.api.get_user_favs = get_user_favs.call
+
+    inline.call(MockTelegramUpdate.with_inline_query(query="favourites:fender"), context)
+
+    assert not get_user_favs.called
+    args = context.bot.answer_inline_query.call_args[0]
+    assert args[1][0].id == submission.submission_id
@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import wait
+
+from functionalities.inline import InlineFunctionality
+from rate_limiter import Priority
+from tests.util.mock_export_api import MockExportAPI, MockSubmission
+from tests.util.mock_method import MockMethod
+from tests.util.mock_telegram_update import MockTelegramUpdate
+
+
+class RecordingPrefetch:
+
+    def __init__(self, inline: InlineFunctionality):
+        self.prefetch = inline._prefetch
+        self.futures = []
+        inline._prefetch = self.call
+
+    def call(self, *args):
+        future = self.prefetch(*args)
+        if future is not None:
+            self.futures.append(future)
+        return future
+
+    def wait(self):
+        wait(self.futures)
+
+
+def test_search_prefetches_next_page(context):
+    submission1 = MockSubmission(234563)
+    submission2 = MockSubmission(234564)
+    inline = InlineFunctionality(MockExportAPI())
+    prefetch = RecordingPrefetch(inline)
+    inline.api.with_search_results("ych", [submission1], page=1)
+    inline.api.with_search_results("ych", [submission2], page=2)
+
+    inline.call(MockTelegramUpdate.with_inline_query(query="YCH"), context)
+    prefetch.wait()
+    get_search_results = MockMethod([])
+    inline.api.get_search_results = get_search_results.call
+    inline._prefetch = MockMethod().call
+    inline.call(MockTelegramUpdate.with_inline_query(query="YCH", offset="2"), context)
+
+    assert not get_search_results.called
+    args = context.bot.answer_inline_query.call_args[0]
+    assert len(args[1]) == 1
+    assert args[1][0].id == submission2.submission_id
+    assert context.bot.answer_inline_query.call_args[1]['next_offset'] == 3
+
+
+def test_gallery_prefetches_next_page(context):
+    submission1 = MockSubmission(234563)
+    submission2 = MockSubmission(234564)
+    inline = InlineFunctionality(MockExportAPI())
+    prefetch = RecordingPrefetch(inline)
+    inline.api.with_user_folder("fender", "gallery", [submission1], page=1)
+    inline.api.with_user_folder("fender", "gallery", [submission2], page=2)
+
+    inline.call(MockTelegramUpdate.with_inline_query(query="gallery:fender"), context)
+    prefetch.wait()
+
+    assert len(prefetch.futures) == 1
+    assert ("gallery", "fender", "2") in inline.result_cache
+
+
+def test_prefetch_uses_background_priority(context):
+    inline = InlineFunctionality(MockExportAPI())
+    prefetch = RecordingPrefetch(inline)
+    get_search_results = MockMethod([MockSubmission(234563)])
+    inline.api.get_search_results = get_search_results.call
+
+    inline.call(MockTelegramUpdate.with_inline_query(query="ych"), context)
+    prefetch.wait()
+
+    assert get_search_results.args == ("ych", 2, Priority.BACKGROUND)
+
+
+def test_no_prefetch_on_last_page(context):
+    inline = InlineFunctionality(MockExportAPI())
+    prefetch = RecordingPrefetch(inline)
+    inline.api.with_search_results("ych", [])
+
+    inline.call(MockTelegramUpdate.with_inline_query(query="ych"), context)
+
+    assert len(prefetch.futures) == 0
+
+
+def test_prefetch_skips_cached_page(context):
+    inline = InlineFunctionality(MockExportAPI())
+    inline.api.with_search_results("ych", [MockSubmission(234563)])
+    inline.result_cache.put(("search", "ych", "2"), ([], ""))
+
+    future = inline._prefetch(("search", "ych", "2"), lambda: ([], ""))
+
+    assert future is None
+
+
+def test_cached_results_does_not_wait_for_running_prefetch(context):
+    inline = InlineFunctionality(MockExportAPI())
+    release = threading.Event()
+
+    def stuck_results():
+        release.wait(2)
+        return [], 3
+    fetch = MockMethod(([], ""))
+    future = inline._prefetch(("search", "ych", "2"), stuck_results)
+
+    start = time.monotonic()
+    results = inline._cached_results(("search", "ych", "2"), fetch.call)
+
+    assert time.monotonic() - start < 0.5
+    assert results == ([], "")
+    assert fetch.called
+    release.set()
+    wait([future])
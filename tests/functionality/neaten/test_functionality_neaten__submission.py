@@ -123,6 +123,31 @@ def test_two_submission_links(context):
     context.bot.send_photo.assert_has_calls(calls)
 
 
+def test_two_submission_links__probes_sizes_before_sending(context):
+    post_id1 = 23636984
+    post_id2 = 23636996
+    update = MockTelegramUpdate.with_message(
+        text="furaffinity.net/view/{}\nfuraffinity.net/view/{}".format(post_id1, post_id2)
+    )
+    submission1 = MockSubmission(post_id1)
+    submission2 = MockSubmission(post_id2)
+    neaten = NeatenFunctionality(MockExportAPI())
+    neaten.api.with_submissions([submission1, submission2])
+    events = []
+    for submission in [submission1, submission2]:
+        submission.start_file_size_probe = lambda sub=submission: events.append(("probe", sub.submission_id))
+    context.bot.send_photo.side_effect = lambda **kwargs: events.append(("send", kwargs["caption"]))
+
+    neaten.call(update, context)
+
+    assert events == [
+        ("probe", str(post_id1)),
+        ("probe", str(post_id2)),
+        ("send", submission1.link),
+        ("send", submission2.link)
+    ]
+
+
 def test_duplicate_submission_links(context):
     post_id = 23636984
     update = MockTelegramUpdate.with_message(
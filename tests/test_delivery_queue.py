@@ -0,0 +1,159 @@
+import threading
+import time
+
+import requests
+from telegram.error import TimedOut, BadRequest, RetryAfter
+from telegram.utils.promise import Promise
+
+from delivery_queue import DeliveryQueue, DeliveryJob, wait_until_sent
+from file_size_probe import ProbeFailed
+
+
+def test_put__sends_job():
+    delivery = DeliveryQueue(2)
+    sent = []
+    delivery.start()
+
+    delivery.put(DeliveryJob(1234, lambda: sent.append("hello"), "test"))
+    delivery.join()
+    delivery.stop()
+
+    assert sent == ["hello"]
+    assert delivery.pending() == 0
+    assert len(delivery.dead_letters) == 0
+
+
+def test_put__keeps_order_per_destination():
+    delivery = DeliveryQueue(4)
+    sent = []
+    delivery.start()
+
+    for num in range(20):
+        delivery.put(DeliveryJob(-5678, lambda n=num: sent.append(n), "test"))
+    delivery.stop()
+
+    assert sent == list(range(20))
+
+
+def test_put__slow_destination_does_not_block_others():
+    delivery = DeliveryQueue(2)
+    release = threading.Event()
+    sent = []
+    delivery.start()
+
+    delivery.put(DeliveryJob(0, lambda: release.wait(2), "slow"))
+    delivery.put(DeliveryJob(1, lambda: sent.append(1), "fast"))
+    time.sleep(0.2)
+
+    assert sent == [1]
+    release.set()
+    delivery.stop()
+
+
+def test_deliver__retries_transient_error():
+    delivery = DeliveryQueue(1)
+    delivery.RETRY_DELAY = 0.01
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise TimedOut()
+    job = DeliveryJob(1234, flaky, "test")
+
+    delivery._deliver(job)
+
+    assert len(attempts) == 3
+    assert job.attempts == 3
+    assert len(delivery.dead_letters) == 0
+
+
+def test_deliver__retry_after():
+    delivery = DeliveryQueue(1)
+    attempts = []
+
+    def flood_limited():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise RetryAfter(0)
+
+    delivery._deliver(DeliveryJob(1234, flood_limited, "test"))
+
+    assert len(attempts) == 2
+
+
+def test_deliver__dead_letters_permanent_error():
+    delivery = DeliveryQueue(1)
+    job = DeliveryJob(1234, lambda: (_ for _ in ()).throw(BadRequest("Chat not found")), "test")
+
+    delivery._deliver(job)
+
+    assert job.attempts == 1
+    assert len(delivery.dead_letters) == 1
+    assert delivery.dead_letters[0].job == job
+    assert isinstance(delivery.dead_letters[0].error, BadRequest)
+
+
+def test_deliver__dead_letters_after_max_retries():
+    delivery = DeliveryQueue(1)
+    delivery.RETRY_DELAY = 0.01
+    job = DeliveryJob(1234, lambda: (_ for _ in ()).throw(TimedOut()), "test")
+
+    delivery._deliver(job)
+
+    assert job.attempts == DeliveryQueue.MAX_RETRIES + 1
+    assert len(delivery.dead_letters) == 1
+
+
+def test_stop__gives_up_waiting_retries():
+    delivery = DeliveryQueue(1)
+    delivery.RETRY_DELAY = 30
+    delivery.start()
+    delivery.put(DeliveryJob(1234, lambda: (_ for _ in ()).throw(TimedOut()), "test"))
+    time.sleep(0.1)
+
+    start_time = time.monotonic()
+    delivery.stop()
+
+    assert time.monotonic() - start_time < 1
+    assert len(delivery.dead_letters) == 1
+
+
+def test_wait_until_sent__raises_error_from_promise():
+    def fail():
+        raise BadRequest("Chat not found")
+    promise = Promise(fail, [], {})
+    threading.Thread(target=promise.run).start()
+
+    try:
+        wait_until_sent(promise)
+        assert False, "Should have raised"
+    except BadRequest:
+        pass
+
+
+def test_wait_until_sent__returns_message():
+    promise = Promise(lambda: "message", [], {})
+    promise.run()
+
+    assert wait_until_sent(promise) == "message"
+    assert wait_until_sent("not a promise") == "not a promise"
+
+
+def test_deliver__retries_error_caused_by_transient_error():
+    delivery = DeliveryQueue(1)
+    delivery.RETRY_DELAY = 0.01
+    attempts = []
+
+    def probe_fails_once():
+        attempts.append(1)
+        if len(attempts) < 2:
+            try:
+                raise requests.ConnectionError()
+            except requests.ConnectionError as e:
+                raise ProbeFailed("Failed to get the size") from e
+
+    delivery._deliver(DeliveryJob(1234, probe_fails_once, "test"))
+
+    assert len(attempts) == 2
+    assert len(delivery.dead_letters) == 0
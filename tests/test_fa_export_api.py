@@ -1,10 +1,15 @@
 import datetime
+import threading
+import time
 import unittest
 
+import requests
 import requests_mock
 
 from fa_export_api import FAExportAPI, PageNotFound
 from fa_submission import FASubmissionFull, FASubmissionShort
+from rate_limiter import RateLimiter, Priority
+from retry_policy import RetryPolicy, CircuitOpen, CircuitBreaker
 from tests.util.submission_builder import SubmissionBuilder
 
 
@@ -17,6 +22,26 @@ class FAExportAPITest(unittest.TestCase):
 
         assert api.base_url == "http://example.com"
 
+    def test_constructor__pool_size(self):
+        api = FAExportAPI("http://example.com/", pool_size=3)
+
+        adapter = api.session.get_adapter("http://example.com/")
+        assert adapter._pool_connections == 3
+        assert adapter._pool_maxsize == 3
+
+    @requests_mock.mock()
+    def test_api_request__reuses_session(self, r):
+        api = FAExportAPI("http://example.com/")
+        session = api.session
+        r.get("http://example.com/resources/1", json={})
+        r.get("http://example.com/resources/2", json={})
+
+        api._api_request("/resources/1")
+        api._api_request("/resources/2")
+
+        assert api.session is session
+        assert r.call_count == 2
+
     @requests_mock.mock()
     def test_api_request(self, r):
         api_url = "http://example.com/"
@@ -101,6 +126,126 @@ class FAExportAPITest(unittest.TestCase):
         assert resp.status_code == 200
         assert resp.json() == test_obj
 
+    @requests_mock.mock()
+    def test_api_request_with_retry__stops_at_deadline(self, r):
+        api = FAExportAPI("http://example.com/")
+        api.retry_policies[Priority.INTERACTIVE] = RetryPolicy(max_retries=7, deadline=2)
+        r.get(
+            "http://example.com/resources/500",
+            text="500 Error. Something broke.",
+            status_code=500
+        )
+
+        start_time = datetime.datetime.now()
+        resp = api._api_request_with_retry("/resources/500")
+        end_time = datetime.datetime.now()
+
+        time_waited = end_time - start_time
+        assert time_waited.total_seconds() <= 2
+        assert resp.status_code == 500
+
+    @requests_mock.mock()
+    def test_api_request_with_retry__retries_connection_error(self, r):
+        api = FAExportAPI("http://example.com/")
+        test_obj = {"key": "value"}
+        r.get(
+            "http://example.com/resources/flaky",
+            [
+                {"exc": requests.exceptions.ConnectionError},
+                {"json": test_obj, "status_code": 200}
+            ]
+        )
+
+        resp = api._api_request_with_retry("/resources/flaky")
+
+        assert resp.json() == test_obj
+        assert r.call_count == 2
+
+    @requests_mock.mock()
+    def test_api_request_with_retry__circuit_breaker_fails_fast(self, r):
+        api = FAExportAPI("http://example.com/")
+        api.retry_policies[Priority.INTERACTIVE] = RetryPolicy(max_retries=0, deadline=None)
+        r.get(
+            "http://example.com/resources/500",
+            text="500 Error. Something broke.",
+            status_code=500
+        )
+        for _ in range(api.CIRCUIT_FAILURE_THRESHOLD):
+            api._api_request_with_retry("/resources/500")
+
+        try:
+            api._api_request_with_retry("/resources/500")
+            assert False, "Should have thrown exception"
+        except CircuitOpen:
+            pass
+        assert r.call_count == api.CIRCUIT_FAILURE_THRESHOLD
+
+    @requests_mock.mock()
+    def test_api_request_with_retry__other_errors_reopen_half_open_circuit(self, r):
+        api = FAExportAPI("http://example.com/")
+        api.circuit_breaker = CircuitBreaker(1, 0.1)
+        api.circuit_breaker.record_failure()
+        time.sleep(0.2)
+        r.get("http://example.com/browse.json?page=1", [
+            {"exc": requests.exceptions.ChunkedEncodingError},
+            {"json": []},
+        ])
+
+        try:
+            api.get_browse_page()
+            assert False, "Should have thrown exception"
+        except requests.exceptions.ChunkedEncodingError:
+            pass
+        assert api.circuit_breaker.state == CircuitBreaker.OPEN
+        time.sleep(0.2)
+
+        assert api.get_browse_page() == []
+        assert api.circuit_breaker.state == CircuitBreaker.CLOSED
+
+    @requests_mock.mock()
+    def test_api_request_with_retry__coalesces_concurrent_requests(self, r):
+        api = FAExportAPI("http://example.com/")
+        test_obj = {"key": "value"}
+
+        def slow_response(_request, _context):
+            time.sleep(0.3)
+            return test_obj
+        r.get("http://example.com/resources/slow", json=slow_response)
+        responses = []
+
+        threads = [
+            threading.Thread(target=lambda: responses.append(api._api_request_with_retry("/resources/slow")))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert r.call_count == 1
+        assert len(responses) == 4
+        for resp in responses:
+            assert resp.json() == test_obj
+
+    @requests_mock.mock()
+    def test_api_request_with_retry__does_not_coalesce_different_priorities(self, r):
+        api = FAExportAPI("http://example.com/")
+
+        def slow_response(_request, _context):
+            time.sleep(0.3)
+            return {"key": "value"}
+        r.get("http://example.com/resources/slow", json=slow_response)
+
+        background = threading.Thread(
+            target=lambda: api._api_request_with_retry("/resources/slow", Priority.BACKGROUND)
+        )
+        background.start()
+        time.sleep(0.1)
+        api._api_request_with_retry("/resources/slow", Priority.INTERACTIVE)
+        background.join()
+
+        assert r.call_count == 2
+
     @requests_mock.mock()
     def test_get_full_submission(self, r):
         builder = SubmissionBuilder(thumb_size=300)
@@ -134,6 +279,56 @@ class FAExportAPITest(unittest.TestCase):
         except PageNotFound as e:
             assert str(e) == f"Submission not found with ID: {post_id}"
 
+    @requests_mock.mock()
+    def test_get_full_submission__cached(self, r):
+        builder = SubmissionBuilder()
+        api = FAExportAPI("http://example.com/")
+        r.get(
+            f"http://example.com/submission/{builder.submission_id}.json",
+            json=builder.build_submission_json()
+        )
+
+        submission1 = api.get_full_submission(builder.submission_id)
+        submission2 = api.get_full_submission(builder.submission_id)
+
+        assert submission1 is submission2
+        assert r.call_count == 1
+        assert api.submission_cache.hits == 1
+        assert api.submission_cache.misses == 1
+
+    @requests_mock.mock()
+    def test_get_full_submission__invalidated(self, r):
+        builder = SubmissionBuilder()
+        api = FAExportAPI("http://example.com/")
+        r.get(
+            f"http://example.com/submission/{builder.submission_id}.json",
+            json=builder.build_submission_json()
+        )
+
+        api.get_full_submission(builder.submission_id)
+        api.invalidate_submission(builder.submission_id)
+        api.get_full_submission(builder.submission_id)
+
+        assert r.call_count == 2
+
+    @requests_mock.mock()
+    def test_get_full_submission_fails__not_cached(self, r):
+        post_id = "45282"
+        api = FAExportAPI("http://example.com/")
+        r.get(
+            f"http://example.com/submission/{post_id}.json",
+            status_code=404
+        )
+
+        for _ in range(2):
+            try:
+                api.get_full_submission(post_id)
+                assert False, "Should have thrown exception"
+            except PageNotFound:
+                pass
+
+        assert r.call_count == 2
+
     @requests_mock.mock()
     def test_get_user_folder(self, r):
         post_id1 = "32342"
@@ -415,3 +610,17 @@ class FAExportAPITest(unittest.TestCase):
         results = api.get_browse_page(5)
 
         assert len(results) == 0
+
+    @requests_mock.mock()
+    def test_get_browse_page__acquires_rate_limit_in_lane(self, r):
+        limiter = RateLimiter(100, 100)
+        api = FAExportAPI("http://example.com/", rate_limiter=limiter)
+        r.get(
+            f"http://example.com/browse.json?page=1",
+            json=[]
+        )
+
+        api.get_browse_page(priority=Priority.BACKGROUND)
+
+        assert limiter.stats[Priority.BACKGROUND].count == 1
+        assert limiter.stats[Priority.INTERACTIVE].count == 0
@@ -0,0 +1,195 @@
+import asyncio
+import datetime
+import unittest
+from typing import Dict, List, Tuple, Any
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from fa_export_api import PageNotFound
+from fa_export_api_async import AsyncFAExportAPI
+from fa_submission import FASubmissionFull, FASubmissionShort
+from tests.util.submission_builder import SubmissionBuilder
+
+
+def _run(coroutine):
+    # asyncio.run() needs python 3.7, and CI runs python 3.6
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class MockAsyncFAExportAPI(AsyncFAExportAPI):
+
+    def __init__(self, responses: Dict[str, List[Tuple[int, Any]]]):
+        super().__init__("http://example.com/")
+        self.responses = responses
+        self.requested = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _api_request(self, path: str) -> Tuple[int, Any]:
+        self.requested.append(path)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.1)
+        self.in_flight -= 1
+        responses = self.responses.get(path, [(404, None)])
+        if len(responses) > 1:
+            return responses.pop(0)
+        return responses[0]
+
+
+class AsyncFAExportAPITest(unittest.TestCase):
+
+    def test_constructor(self):
+        api = AsyncFAExportAPI("http://example.com/", pool_size=4)
+
+        assert api.base_url == "http://example.com"
+        assert api.pool_size == 4
+
+    def test_api_request(self):
+        test_obj = {"key": "value"}
+
+        async def handler(_):
+            return web.json_response(test_obj)
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/resources/123", handler)
+            async with TestServer(app) as server:
+                async with AsyncFAExportAPI(str(server.make_url("/"))) as api:
+                    return await api._api_request("/resources/123")
+
+        status, data = _run(run())
+
+        assert status == 200
+        assert data == test_obj
+
+    def test_api_request_with_retry__retries_500_error(self):
+        test_obj = {"key": "value"}
+        api = MockAsyncFAExportAPI({
+            "resources/500": [(500, None), (500, None), (200, test_obj)]
+        })
+
+        start_time = datetime.datetime.now()
+        status, data = _run(api._api_request_with_retry("resources/500"))
+        end_time = datetime.datetime.now()
+
+        time_waited = end_time - start_time
+        assert 0.5 <= time_waited.seconds <= 5
+        assert status == 200
+        assert data == test_obj
+
+    def test_get_full_submission(self):
+        builder = SubmissionBuilder(thumb_size=300)
+        api = MockAsyncFAExportAPI({
+            f"submission/{builder.submission_id}.json": [(200, builder.build_submission_json())]
+        })
+
+        submission = _run(api.get_full_submission(builder.submission_id))
+
+        assert isinstance(submission, FASubmissionFull)
+        assert submission.submission_id == builder.submission_id
+        assert submission.thumbnail_url == builder.thumbnail_url.replace("@300-", "@1600-")
+        assert submission.download_url == builder.download_url
+
+    def test_get_full_submission_fails(self):
+        api = MockAsyncFAExportAPI({})
+
+        try:
+            _run(api.get_full_submission("45282"))
+            assert False, "Should have thrown exception"
+        except PageNotFound as e:
+            assert str(e) == "Submission not found with ID: 45282"
+
+    def test_get_full_submissions__fetches_concurrently_in_order(self):
+        builders = [SubmissionBuilder() for _ in range(10)]
+        api = MockAsyncFAExportAPI({
+            f"submission/{builder.submission_id}.json": [(200, builder.build_submission_json())]
+            for builder in builders
+        })
+
+        start_time = datetime.datetime.now()
+        results = _run(api.get_full_submissions([builder.submission_id for builder in builders] + ["123"]))
+        end_time = datetime.datetime.now()
+
+        assert (end_time - start_time).total_seconds() < 0.5
+        assert api.max_in_flight == 11
+        assert len(results) == 11
+        assert [x.submission_id for x in results[:10]] == [builder.submission_id for builder in builders]
+        assert results[10] is None
+
+    def test_get_user_folder(self):
+        builder1 = SubmissionBuilder()
+        builder2 = SubmissionBuilder()
+        api = MockAsyncFAExportAPI({
+            "user/fender/scraps.json?page=2&full=1": [
+                (200, [builder1.build_search_json(), builder2.build_search_json()])
+            ]
+        })
+
+        results = _run(api.get_user_folder("fender", "scraps", 2))
+
+        assert len(results) == 2
+        assert isinstance(results[0], FASubmissionShort)
+        assert results[0].submission_id == builder1.submission_id
+        assert results[1].submission_id == builder2.submission_id
+
+    def test_get_user_folder_does_not_exist(self):
+        api = MockAsyncFAExportAPI({})
+
+        try:
+            _run(api.get_user_folder("dont-real", "gallery"))
+            assert False, "Should have thrown exception"
+        except PageNotFound as e:
+            assert str(e) == "User not found by name: dont-real"
+
+    def test_get_user_favs(self):
+        builder = SubmissionBuilder()
+        search_json = builder.build_search_json()
+        search_json["fav_id"] = "4321"
+        api = MockAsyncFAExportAPI({
+            "user/fender/favorites.json?next=1234&full=1": [(200, [search_json])]
+        })
+
+        results = _run(api.get_user_favs("fender", "1234"))
+
+        assert len(results) == 1
+        assert results[0].submission_id == builder.submission_id
+        assert results[0].fav_id == "4321"
+
+    def test_get_search_results(self):
+        builder = SubmissionBuilder()
+        api = MockAsyncFAExportAPI({
+            "search.json?full=1&perpage=48&q=deer&page=1": [(200, [builder.build_search_json()])]
+        })
+
+        results = _run(api.get_search_results("deer"))
+
+        assert len(results) == 1
+        assert results[0].submission_id == builder.submission_id
+
+    def test_get_browse_page(self):
+        builder = SubmissionBuilder()
+        api = MockAsyncFAExportAPI({
+            "browse.json?page=5": [(200, [builder.build_search_json()])]
+        })
+
+        results = _run(api.get_browse_page(5))
+
+        assert len(results) == 1
+        assert results[0].submission_id == builder.submission_id
+
+    def test_get_browse_page__fails(self):
+        api = MockAsyncFAExportAPI({
+            "browse.json?page=1": [(404, None)]
+        })
+
+        try:
+            _run(api.get_browse_page())
+            assert False, "Should have thrown exception"
+        except ValueError:
+            pass
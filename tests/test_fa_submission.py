@@ -1,12 +1,16 @@
+import datetime
 import unittest
 
 from unittest.mock import patch
+import requests
 import requests_mock
 import telegram
 
 from functionalities.neaten import NeatenFunctionality
 from fa_submission import FASubmission, FASubmissionShort, FASubmissionFull, CantSendFileType, FAUser, FAUserShort, \
     Rating
+from file_id_cache import FileIdCache
+from file_size_probe import ProbeFailed
 from tests.util.submission_builder import SubmissionBuilder
 
 
@@ -52,6 +56,28 @@ class FAUserTest(unittest.TestCase):
         assert author.profile_name == profile_name
         assert f"/user/{profile_name}" in author.link
 
+    def test_from_submission_dict__shares_users(self):
+        author1 = FAUser.from_submission_dict({"name": "Shared", "profile_name": "shared"})
+        author2 = FAUser.from_submission_dict({"name": "Shared", "profile_name": "shared"})
+        author3 = FAUser.from_submission_dict({"name": "Other", "profile_name": "other"})
+
+        assert author1 is author2
+        assert author3 is not author1
+
+    def test_from_submission_dict__name_changed(self):
+        author1 = FAUser.from_submission_dict({"name": "Old name", "profile_name": "renamed"})
+        author2 = FAUser.from_submission_dict({"name": "New name", "profile_name": "renamed"})
+
+        assert author2.name == "New name"
+        assert FAUser.from_submission_dict({"name": "New name", "profile_name": "renamed"}) is author2
+
+    def test_cannot_be_changed(self):
+        author = FAUser("John", "john")
+
+        with self.assertRaises(AttributeError):
+            author.name = "Fred"
+        assert author.name == "John"
+
 
 class FAUserShortTest(unittest.TestCase):
 
@@ -266,6 +292,92 @@ class FASubmissionFullTest(unittest.TestCase):
         assert isinstance(file_size2, int)
         assert file_size2 == size
 
+    @requests_mock.mock()
+    def test_start_file_size_probe(self, r):
+        submission = SubmissionBuilder(file_ext="png").build_full_submission()
+        r.head(submission.download_url, headers={"content-length": "23124"})
+
+        submission.start_file_size_probe()
+        submission._download_file_size_future.result()
+        r.head(submission.download_url, status_code=404)
+
+        assert submission.download_file_size == 23124
+        assert r.call_count == 1
+
+    @requests_mock.mock()
+    def test_start_file_size_probe__failed_probe_is_tried_again(self, r):
+        submission = SubmissionBuilder(file_ext="png").build_full_submission()
+        r.head(submission.download_url, exc=requests.ConnectionError)
+        submission.start_file_size_probe()
+        try:
+            submission.download_file_size
+            assert False, "Should have thrown exception"
+        except ProbeFailed:
+            pass
+        r.head(submission.download_url, headers={"content-length": "23124"})
+
+        assert submission.download_file_size == 23124
+
+    def test_start_file_size_probe__not_needed_for_documents(self):
+        submission = SubmissionBuilder(file_ext="txt").build_full_submission()
+
+        submission.start_file_size_probe()
+
+        assert submission._download_file_size_future is None
+
+    @requests_mock.mock()
+    def test_fetch_file_sizes(self, r):
+        submission1 = SubmissionBuilder().build_full_submission()
+        submission2 = SubmissionBuilder().build_full_submission()
+        submission3 = SubmissionBuilder(file_size=1234).build_full_submission()
+        r.head(submission1.download_url, headers={"content-length": "23124"})
+        r.head(submission2.download_url, headers={"content-length": "4312"})
+
+        FASubmissionFull.fetch_file_sizes([submission1, submission2, submission3])
+
+        assert submission1.download_file_size == 23124
+        assert submission2.download_file_size == 4312
+        assert submission3.download_file_size == 1234
+        assert r.call_count == 2
+
+    @requests_mock.mock()
+    def test_fetch_file_sizes__skips_documents(self, r):
+        submission = SubmissionBuilder(file_ext="txt").build_full_submission()
+
+        FASubmissionFull.fetch_file_sizes([submission])
+
+        assert submission._download_file_size is None
+        assert r.call_count == 0
+
+    def test_submissions_and_users_have_no_dict(self):
+        short = FASubmission.from_short_dict(SubmissionBuilder().build_search_json())
+        full = SubmissionBuilder().build_full_submission()
+
+        assert not hasattr(short, "__dict__")
+        assert not hasattr(full, "__dict__")
+        assert not hasattr(full.author, "__dict__")
+
+    def test_words(self):
+        submission = SubmissionBuilder(
+            title="Deer, in the \"Woods\"",
+            description="A <b>big</b> forest",
+            keywords=["Tree", "leaf"]
+        ).build_full_submission()
+
+        words = submission.words
+
+        assert words == frozenset({"deer", "in", "the", "woods", "a", "b", "big", "forest", "tree", "leaf", ""})
+
+    def test_words__worked_out_once(self):
+        submission = SubmissionBuilder(title="Deer", description="forest", keywords=[]).build_full_submission()
+
+        words1 = submission.words
+        submission.title = "Lion"
+        words2 = submission.words
+
+        assert words1 is words2
+        assert "deer" in words2
+
     @patch.object(telegram, "Bot")
     def test_gif_submission(self, bot):
         submission = SubmissionBuilder(file_ext="gif", file_size=47453).build_full_submission()
@@ -441,6 +553,74 @@ class FASubmissionFullTest(unittest.TestCase):
         assert bot.send_photo.call_args[1]['reply_to_message_id'] == message_id
         assert bot.send_photo.call_args[1]['parse_mode'] == telegram.ParseMode.MARKDOWN
 
+    def test_to_input_media_photo(self):
+        submission = SubmissionBuilder(file_ext="png", file_size=FASubmission.SIZE_LIMIT_IMAGE - 1)\
+            .build_full_submission()
+
+        media = submission.to_input_media_photo("Update")
+
+        assert media.media == submission.download_url
+        assert media.caption == "Update"
+
+    def test_to_input_media_photo__large_image_sends_thumbnail(self):
+        submission = SubmissionBuilder(file_ext="png", file_size=FASubmission.SIZE_LIMIT_IMAGE + 1)\
+            .build_full_submission()
+
+        media = submission.to_input_media_photo("Update")
+
+        assert media.media == submission.thumbnail_url
+        assert submission.download_url in media.caption
+        assert media.parse_mode == telegram.ParseMode.MARKDOWN
+
+    @requests_mock.mock()
+    def test_to_input_media_photo__unknown_size_sends_thumbnail(self, r):
+        submission = SubmissionBuilder(file_ext="png").build_full_submission()
+        r.head(submission.download_url, exc=requests.ConnectionError)
+
+        media = submission.to_input_media_photo("Update")
+
+        assert media.media == submission.thumbnail_url
+        assert submission.download_url in media.caption
+
+    def test_to_input_media_photo__not_photo(self):
+        submission = SubmissionBuilder(file_ext="pdf", file_size=1000).build_full_submission()
+
+        assert submission.to_input_media_photo("Update") is None
+
+    @patch.object(telegram, "Bot")
+    def test_send_message__reuses_cached_file_id(self, bot):
+        submission = SubmissionBuilder(file_ext="jpg", file_size=FASubmission.SIZE_LIMIT_IMAGE - 1)\
+            .build_full_submission()
+        file_id_cache = FileIdCache(10)
+        sent_message = telegram.Message(
+            1, None, datetime.datetime.now(), telegram.Chat(-9327622, telegram.Chat.GROUP),
+            photo=[telegram.PhotoSize("file_id", "file_id", 900, 900)]
+        )
+        bot.send_photo.return_value = sent_message
+
+        submission.send_message(bot, -9327622, file_id_cache=file_id_cache)
+        submission.send_message(bot, -9327622, file_id_cache=file_id_cache)
+
+        assert bot.send_photo.call_count == 2
+        assert bot.send_photo.call_args_list[0][1]['photo'] == submission.download_url
+        assert bot.send_photo.call_args_list[1][1]['photo'] == "file_id"
+        assert file_id_cache.get(submission.submission_id, FileIdCache.PHOTO) == "file_id"
+
+    @patch.object(telegram, "Bot")
+    def test_send_message__resends_from_url_when_cached_file_id_rejected(self, bot):
+        submission = SubmissionBuilder(file_ext="jpg", file_size=FASubmission.SIZE_LIMIT_IMAGE - 1)\
+            .build_full_submission()
+        file_id_cache = FileIdCache(10)
+        file_id_cache._put((submission.submission_id, FileIdCache.PHOTO), "expired_file_id")
+        bot.send_photo.side_effect = [telegram.error.BadRequest("Wrong file identifier/http url specified"), None]
+
+        submission.send_message(bot, -9327622, file_id_cache=file_id_cache)
+
+        assert bot.send_photo.call_count == 2
+        assert bot.send_photo.call_args_list[0][1]['photo'] == "expired_file_id"
+        assert bot.send_photo.call_args_list[1][1]['photo'] == submission.download_url
+        assert file_id_cache.get(submission.submission_id, FileIdCache.PHOTO) is None
+
     @patch.object(telegram, "Bot")
     def test_send_message__with_prefix(self, bot):
         submission = SubmissionBuilder(file_ext="jpg", file_size=FASubmission.SIZE_LIMIT_IMAGE - 1)\
@@ -0,0 +1,128 @@
+import datetime
+import os
+
+import telegram
+from telegram.utils.promise import Promise
+
+from file_id_cache import FileIdCache
+
+TEST_CACHE_FILE = "./test_file_id_cache.json"
+
+
+def setup_function():
+    FileIdCache.FILENAME = TEST_CACHE_FILE
+    if os.path.exists(TEST_CACHE_FILE):
+        os.remove(TEST_CACHE_FILE)
+
+
+def teardown_function():
+    FileIdCache.FILENAME = "file_ids.json"
+    if os.path.exists(TEST_CACHE_FILE):
+        os.remove(TEST_CACHE_FILE)
+
+
+def _message(**kwargs) -> telegram.Message:
+    return telegram.Message(1, None, datetime.datetime.now(), telegram.Chat(12345, telegram.Chat.PRIVATE), **kwargs)
+
+
+def _photo_message(file_id: str) -> telegram.Message:
+    return _message(photo=[
+        telegram.PhotoSize(f"{file_id}_small", f"{file_id}_small", 90, 90),
+        telegram.PhotoSize(file_id, file_id, 900, 900)
+    ])
+
+
+def test_get__missing():
+    cache = FileIdCache(10)
+
+    assert cache.get("1234", FileIdCache.PHOTO) is None
+    assert cache.misses == 1
+
+
+def test_record__photo_uses_largest_size():
+    cache = FileIdCache(10)
+
+    cache.record("1234", FileIdCache.PHOTO, _photo_message("photo_id"))
+
+    assert cache.get("1234", FileIdCache.PHOTO) == "photo_id"
+    assert cache.get("1234", FileIdCache.THUMBNAIL) is None
+    assert cache.hits == 1
+
+
+def test_record__document_and_audio():
+    cache = FileIdCache(10)
+
+    cache.record("1234", FileIdCache.DOCUMENT, _message(document=telegram.Document("doc_id", "doc_id")))
+    cache.record("1235", FileIdCache.AUDIO, _message(audio=telegram.Audio("audio_id", "audio_id", 30)))
+
+    assert cache.get("1234", FileIdCache.DOCUMENT) == "doc_id"
+    assert cache.get("1235", FileIdCache.AUDIO) == "audio_id"
+
+
+def test_record__promise_recorded_once_sent():
+    cache = FileIdCache(10)
+    promise = Promise(lambda: _photo_message("photo_id"), [], {})
+
+    cache.record("1234", FileIdCache.PHOTO, promise)
+
+    assert cache.get("1234", FileIdCache.PHOTO) is None
+    promise.run()
+    assert cache.get("1234", FileIdCache.PHOTO) == "photo_id"
+
+
+def test_record__failed_promise_not_recorded():
+    cache = FileIdCache(10)
+
+    def fail():
+        raise telegram.error.BadRequest("Wrong file identifier")
+    promise = Promise(fail, [], {})
+    cache.record("1234", FileIdCache.PHOTO, promise)
+    promise.run()
+
+    assert cache.get("1234", FileIdCache.PHOTO) is None
+    assert len(cache) == 0
+
+
+def test_evicts_least_recently_used():
+    cache = FileIdCache(2)
+    cache.record("1", FileIdCache.PHOTO, _photo_message("a"))
+    cache.record("2", FileIdCache.PHOTO, _photo_message("b"))
+    cache.get("1", FileIdCache.PHOTO)
+
+    cache.record("3", FileIdCache.PHOTO, _photo_message("c"))
+
+    assert len(cache) == 2
+    assert cache.get("1", FileIdCache.PHOTO) == "a"
+    assert cache.get("2", FileIdCache.PHOTO) is None
+    assert cache.get("3", FileIdCache.PHOTO) == "c"
+
+
+def test_save_and_load():
+    cache = FileIdCache(10)
+    cache.record("1234", FileIdCache.PHOTO, _photo_message("photo_id"))
+    cache.record("1234", FileIdCache.THUMBNAIL, _photo_message("thumb_id"))
+
+    cache.save_to_json()
+    new_cache = FileIdCache.load_from_json(10)
+
+    assert len(new_cache) == 2
+    assert new_cache.get("1234", FileIdCache.PHOTO) == "photo_id"
+    assert new_cache.get("1234", FileIdCache.THUMBNAIL) == "thumb_id"
+
+
+def test_load__no_file():
+    cache = FileIdCache.load_from_json(10)
+
+    assert len(cache) == 0
+
+
+def test_invalidate():
+    cache = FileIdCache(10)
+    cache._put(("1234", FileIdCache.PHOTO), "file_id")
+    cache._put(("1234", FileIdCache.THUMBNAIL), "thumbnail_file_id")
+
+    cache.invalidate("1234", FileIdCache.PHOTO)
+    cache.invalidate("5678", FileIdCache.PHOTO)
+
+    assert cache.get("1234", FileIdCache.PHOTO) is None
+    assert cache.get("1234", FileIdCache.THUMBNAIL) == "thumbnail_file_id"
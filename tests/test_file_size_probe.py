@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+import requests
+import requests_mock
+
+from file_size_probe import FileSizeProbe, ProbeFailed
+
+
+def test_get_size():
+    probe = FileSizeProbe()
+    with requests_mock.Mocker() as r:
+        r.head("http://example.com/file.jpg", headers={"content-length": "7567"})
+
+        assert probe.get_size("http://example.com/file.jpg") == 7567
+
+
+def test_get_size__cached_by_url():
+    probe = FileSizeProbe()
+    with requests_mock.Mocker() as r:
+        r.head("http://example.com/file.jpg", headers={"content-length": "7567"})
+        probe.get_size("http://example.com/file.jpg")
+
+        assert probe.get_size("http://example.com/file.jpg") == 7567
+        assert r.call_count == 1
+
+
+def test_get_size__failure_is_cached():
+    probe = FileSizeProbe()
+    with requests_mock.Mocker() as r:
+        r.head("http://example.com/file.jpg", status_code=404)
+
+        with pytest.raises(ProbeFailed):
+            probe.get_size("http://example.com/file.jpg")
+        with pytest.raises(ProbeFailed):
+            probe.get_size("http://example.com/file.jpg")
+        assert r.call_count == 1
+
+
+def test_get_size__failure_expires():
+    probe = FileSizeProbe()
+    probe.FAILURE_TTL = 0.05
+    with requests_mock.Mocker() as r:
+        r.head("http://example.com/file.jpg", status_code=404)
+        with pytest.raises(ProbeFailed):
+            probe.get_size("http://example.com/file.jpg")
+        r.head("http://example.com/file.jpg", headers={"content-length": "7567"})
+        time.sleep(0.1)
+
+        assert probe.get_size("http://example.com/file.jpg") == 7567
+
+
+def test_get_size__connection_error_is_not_cached():
+    probe = FileSizeProbe()
+    with requests_mock.Mocker() as r:
+        r.head("http://example.com/file.jpg", exc=requests.ConnectionError)
+        with pytest.raises(ProbeFailed) as e:
+            probe.get_size("http://example.com/file.jpg")
+        r.head("http://example.com/file.jpg", headers={"content-length": "7567"})
+
+        assert isinstance(e.value.__cause__, requests.ConnectionError)
+        assert probe.get_size("http://example.com/file.jpg") == 7567
+
+
+def test_get_size__missing_content_length():
+    probe = FileSizeProbe()
+    with requests_mock.Mocker() as r:
+        r.head("http://example.com/file.jpg")
+
+        with pytest.raises(ProbeFailed):
+            probe.get_size("http://example.com/file.jpg")
+
+
+def test_probe_many():
+    probe = FileSizeProbe()
+    with requests_mock.Mocker() as r:
+        r.head("http://example.com/1.jpg", headers={"content-length": "100"})
+        r.head("http://example.com/2.jpg", headers={"content-length": "200"})
+        r.head("http://example.com/3.jpg", status_code=500)
+
+        sizes = probe.probe_many([
+            "http://example.com/1.jpg", "http://example.com/2.jpg", "http://example.com/3.jpg", "http://example.com/1.jpg"
+        ])
+
+        assert sizes == {"http://example.com/1.jpg": 100, "http://example.com/2.jpg": 200, "http://example.com/3.jpg": None}
+        assert r.call_count == 3
+
+
+def test_probe_many__runs_concurrently_up_to_workers():
+    probe = FileSizeProbe(workers=3)
+    running = []
+    max_running = []
+    lock = threading.Lock()
+
+    def slow_probe(url):
+        with lock:
+            running.append(url)
+            max_running.append(len(running))
+        time.sleep(0.1)
+        with lock:
+            running.remove(url)
+        return 100
+    probe._probe_uncached = slow_probe
+
+    sizes = probe.probe_many([f"http://example.com/{num}.jpg" for num in range(6)])
+
+    assert sizes == {f"http://example.com/{num}.jpg": 100 for num in range(6)}
+    assert max(max_running) == 3
+
+
+def test_probe__coalesces_concurrent_probes():
+    probe = FileSizeProbe()
+    calls = []
+
+    def slow_probe(url):
+        calls.append(url)
+        time.sleep(0.1)
+        return 100
+    probe._probe_uncached = slow_probe
+
+    futures = [probe.probe("http://example.com/file.jpg") for _ in range(4)]
+
+    assert [future.result() for future in futures] == [100] * 4
+    assert calls == ["http://example.com/file.jpg"]
@@ -0,0 +1,81 @@
+import threading
+import time
+
+from rate_limiter import RateLimiter, Priority, TokenBucket
+
+
+def test_token_bucket__refills_at_rate():
+    bucket = TokenBucket(10, 5)
+    bucket.tokens = 0
+    start = bucket.last_refill
+
+    bucket.refill(start + 0.2)
+
+    assert 1.9 < bucket.tokens < 2.1
+
+
+def test_token_bucket__does_not_exceed_capacity():
+    bucket = TokenBucket(10, 5)
+
+    bucket.refill(bucket.last_refill + 10)
+
+    assert bucket.tokens == 5
+
+
+def test_acquire__within_burst_does_not_wait():
+    limiter = RateLimiter(1, 5)
+
+    waits = [limiter.acquire() for _ in range(5)]
+
+    assert all(wait < 0.1 for wait in waits)
+    assert limiter.stats[Priority.INTERACTIVE].count == 5
+
+
+def test_acquire__waits_for_token():
+    limiter = RateLimiter(10, 1)
+    limiter.acquire()
+
+    wait = limiter.acquire()
+
+    assert 0.05 <= wait <= 0.2
+    assert limiter.stats[Priority.INTERACTIVE].max_wait == wait
+
+
+def test_acquire__lane_limit():
+    limiter = RateLimiter(100, 100, {Priority.BACKGROUND: (10, 1)})
+    limiter.acquire(Priority.BACKGROUND)
+
+    background_wait = limiter.acquire(Priority.BACKGROUND)
+    interactive_wait = limiter.acquire(Priority.INTERACTIVE)
+
+    assert background_wait >= 0.05
+    assert interactive_wait < 0.05
+    assert limiter.stats[Priority.BACKGROUND].count == 2
+    assert limiter.stats[Priority.BACKGROUND].average_wait > 0
+
+
+def test_acquire__interactive_served_before_background():
+    limiter = RateLimiter(10, 1)
+    limiter.acquire()
+    order = []
+
+    def background():
+        limiter.acquire(Priority.BACKGROUND)
+        order.append(Priority.BACKGROUND)
+
+    def interactive():
+        limiter.acquire(Priority.INTERACTIVE)
+        order.append(Priority.INTERACTIVE)
+
+    threads = [threading.Thread(target=background) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.01)
+    interactive_thread = threading.Thread(target=interactive)
+    interactive_thread.start()
+    threads.append(interactive_thread)
+    for thread in threads:
+        thread.join()
+
+    assert order[0] == Priority.INTERACTIVE
+    assert len(order) == 4
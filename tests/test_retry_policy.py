@@ -0,0 +1,118 @@
+import time
+
+from retry_policy import RetryPolicy, RetryBudget, CircuitBreaker, CircuitOpen
+
+
+def test_backoff__exponential_with_jitter():
+    policy = RetryPolicy(max_retries=5, deadline=None, base_delay=1, max_delay=30)
+
+    for tries, (low, high) in enumerate([(0.5, 1), (1, 2), (2, 4), (4, 8)]):
+        delay = policy.backoff(tries)
+        assert low <= delay <= high
+
+
+def test_backoff__capped_at_max_delay():
+    policy = RetryPolicy(max_retries=20, deadline=None, base_delay=1, max_delay=5)
+
+    assert policy.backoff(15) <= 5
+
+
+def test_should_retry__max_retries():
+    policy = RetryPolicy(max_retries=2, deadline=None)
+
+    assert policy.should_retry(1, 1, policy.start())
+    assert not policy.should_retry(2, 1, policy.start())
+
+
+def test_should_retry__respects_deadline():
+    policy = RetryPolicy(max_retries=10, deadline=2)
+    deadline_time = policy.start()
+
+    assert policy.should_retry(0, 1, deadline_time)
+    assert not policy.should_retry(0, 3, deadline_time)
+
+
+def test_request_timeout():
+    assert RetryPolicy(max_retries=1, deadline=None).request_timeout(None) is None
+    policy = RetryPolicy(max_retries=1, deadline=5)
+    assert 4 < policy.request_timeout(policy.start()) <= 5
+    assert policy.request_timeout(time.monotonic() - 10) == RetryPolicy.MIN_REQUEST_TIMEOUT
+
+
+def test_retry_budget__limits_retries():
+    budget = RetryBudget(0.5, 2)
+
+    assert budget.try_spend()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.record_request()
+    assert not budget.try_spend()
+    budget.record_request()
+    assert budget.try_spend()
+
+
+def test_circuit_breaker__opens_after_threshold():
+    breaker = CircuitBreaker(2, 30)
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+
+    try:
+        breaker.check()
+        assert False, "Should have thrown exception"
+    except CircuitOpen:
+        pass
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_circuit_breaker__success_resets_failures():
+    breaker = CircuitBreaker(2, 30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    breaker.check()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker__half_open_after_timeout():
+    breaker = CircuitBreaker(1, 0.1)
+    breaker.record_failure()
+    time.sleep(0.2)
+
+    breaker.check()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    try:
+        breaker.check()
+        assert False, "Only one trial request should be allowed"
+    except CircuitOpen:
+        pass
+    breaker.record_success()
+    breaker.check()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker__half_open_failure_reopens():
+    breaker = CircuitBreaker(5, 0.1)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.2)
+    breaker.check()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_circuit_breaker__new_trial_if_trial_result_never_recorded():
+    breaker = CircuitBreaker(1, 0.1)
+    breaker.record_failure()
+    time.sleep(0.2)
+    breaker.check()
+    time.sleep(0.2)
+
+    breaker.check()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from single_flight import SingleFlight
+
+
+def test_do__returns_result():
+    flight = SingleFlight()
+
+    assert flight.do("key", lambda: "value") == "value"
+    assert flight.in_flight() == 0
+
+
+def test_do__raises_exception():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("broken")
+
+    try:
+        flight.do("key", fail)
+        assert False, "Should have thrown exception"
+    except ValueError as e:
+        assert str(e) == "broken"
+    assert flight.in_flight() == 0
+
+
+def test_do__coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.3)
+        return object()
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 5
+    assert all(result is results[0] for result in results)
+
+
+def test_do__different_keys_not_coalesced():
+    flight = SingleFlight()
+    calls = []
+
+    def slow(key):
+        calls.append(key)
+        time.sleep(0.2)
+        return key
+
+    threads = [threading.Thread(target=lambda k=k: flight.do(k, lambda: slow(k))) for k in ["a", "b"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(calls) == ["a", "b"]
+
+
+def test_do__sequential_calls_not_coalesced():
+    flight = SingleFlight()
+    calls = []
+
+    flight.do("key", lambda: calls.append(1))
+    flight.do("key", lambda: calls.append(1))
+
+    assert len(calls) == 2
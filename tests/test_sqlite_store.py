@@ -0,0 +1,139 @@
+import datetime
+import os
+
+from sqlite_store import SQLiteStore
+
+TEST_DB_FILE = "./test_sqlite_store.sqlite"
+
+
+def _remove_db():
+    for suffix in ["", "-wal", "-shm"]:
+        if os.path.exists(TEST_DB_FILE + suffix):
+            os.remove(TEST_DB_FILE + suffix)
+
+
+def setup_function():
+    _remove_db()
+
+
+def teardown_function():
+    _remove_db()
+
+
+def test_new_store_is_empty():
+    store = SQLiteStore(TEST_DB_FILE)
+
+    assert store.is_empty()
+    assert store.load_subscriptions() == []
+    assert store.load_blocklists() == {}
+    assert store.load_latest_ids() == []
+    store.close()
+
+
+def test_uses_wal_mode():
+    store = SQLiteStore(TEST_DB_FILE)
+
+    assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    store.close()
+
+
+def test_add_and_remove_subscriptions():
+    store = SQLiteStore(TEST_DB_FILE)
+    for query, destination in [("zebra", 1234), ("apple", 1234), ("other", 5678)]:
+        store.apply_change({
+            "type": "add_subscription",
+            "subscription": {"query": query, "destination": destination, "latest_update": None}
+        })
+    store.apply_change({"type": "remove_subscription", "query": "other", "destination": 5678})
+
+    assert not store.is_empty()
+    assert sorted(store.load_subscriptions()) == [("apple", 1234, None), ("zebra", 1234, None)]
+    store.close()
+
+
+def test_blocklists_by_destination():
+    store = SQLiteStore(TEST_DB_FILE)
+    store.apply_change({"type": "add_blocklist", "destination": 1234, "tag": "ych"})
+    store.apply_change({"type": "add_blocklist", "destination": 1234, "tag": "ych"})
+    store.apply_change({"type": "add_blocklist", "destination": 1234, "tag": "example"})
+    store.apply_change({"type": "add_blocklist", "destination": 5678, "tag": "test"})
+    store.apply_change({"type": "remove_blocklist", "destination": 5678, "tag": "test"})
+
+    assert store.blocklist(1234) == {"ych", "example"}
+    assert store.blocklist(5678) == set()
+    assert store.load_blocklists() == {1234: {"ych", "example"}}
+    store.close()
+
+
+def test_latest_ids_are_limited():
+    store = SQLiteStore(TEST_DB_FILE)
+    for num in range(20):
+        store.apply_change({"type": "latest_id", "id": str(num)})
+
+    assert store.load_latest_ids() == [str(num) for num in range(5, 20)]
+    store.close()
+
+
+def test_record_delivery():
+    store = SQLiteStore(TEST_DB_FILE)
+    store.apply_change({
+        "type": "add_subscription",
+        "subscription": {"query": "query", "destination": 1234, "latest_update": None}
+    })
+    sent_at = datetime.datetime(2019, 5, 1, 12, 30)
+
+    store.record_delivery("123243", 1234, "query", sent_at)
+
+    assert store.deliveries(1234) == [("123243", "query", sent_at)]
+    assert store.deliveries(5678) == []
+    assert store.load_subscriptions() == [("query", 1234, sent_at)]
+    store.close()
+
+
+def test_prune_delivery_history():
+    store = SQLiteStore(TEST_DB_FILE)
+    now = datetime.datetime(2019, 5, 1, 12, 30)
+    old = now - datetime.timedelta(days=SQLiteStore.DELIVERY_HISTORY_DAYS + 1)
+    recent = now - datetime.timedelta(days=1)
+    store.record_delivery("123243", 1234, "query", old)
+    store.record_delivery("123244", 1234, "query", recent)
+
+    store.prune_delivery_history(now)
+
+    assert store.deliveries(1234) == [("123244", "query", recent)]
+    store.close()
+
+
+def test_record_delivery__prunes_history_every_few_deliveries():
+    store = SQLiteStore(TEST_DB_FILE)
+    store.PRUNE_EVERY_DELIVERIES = 3
+    old = datetime.datetime.now() - datetime.timedelta(days=SQLiteStore.DELIVERY_HISTORY_DAYS + 1)
+
+    for num in range(3):
+        store.record_delivery(str(num), 1234, "query", old)
+
+    assert store.deliveries(1234) == []
+    store.close()
+
+
+def test_prunes_history_when_opened():
+    store = SQLiteStore(TEST_DB_FILE)
+    old = datetime.datetime.now() - datetime.timedelta(days=SQLiteStore.DELIVERY_HISTORY_DAYS + 1)
+    store.record_delivery("123243", 1234, "query", old)
+    store.close()
+
+    store = SQLiteStore(TEST_DB_FILE)
+
+    assert store.deliveries(1234) == []
+    store.close()
+
+
+def test_persists_between_connections():
+    store = SQLiteStore(TEST_DB_FILE)
+    store.apply_change({"type": "add_blocklist", "destination": 1234, "tag": "ych"})
+    store.close()
+
+    store = SQLiteStore(TEST_DB_FILE)
+
+    assert store.blocklist(1234) == {"ych"}
+    store.close()
@@ -0,0 +1,73 @@
+import pytest
+
+from fa_submission import FASubmissionShort, FASubmissionShortFav
+from submission_page import SubmissionPage
+
+
+def _submission_data(submission_id: int, **kwargs):
+    data = {
+        "id": str(submission_id),
+        "thumbnail": f"https://t.facdn.net/{submission_id}@400-1562445328.jpg",
+        "title": f"Submission {submission_id}",
+        "name": "John",
+        "profile_name": "john",
+    }
+    data.update(kwargs)
+    return data
+
+
+def test_submission_ids_does_not_build_submissions():
+    page = SubmissionPage([_submission_data(num) for num in range(5)])
+
+    assert page.submission_ids == ["0", "1", "2", "3", "4"]
+    assert page._submissions == [None] * 5
+
+
+def test_getitem_builds_submission_once():
+    page = SubmissionPage([_submission_data(num) for num in range(5)])
+
+    submission = page[1]
+
+    assert isinstance(submission, FASubmissionShort)
+    assert submission.submission_id == "1"
+    assert submission.thumbnail_url == "https://t.facdn.net/1@1600-1562445328.jpg"
+    assert page[1] is submission
+    assert page._submissions[0] is None
+    assert page._submissions[2] is None
+
+
+def test_getitem_negative_and_out_of_range():
+    page = SubmissionPage([_submission_data(num) for num in range(3)])
+
+    assert page[-1].submission_id == "2"
+    with pytest.raises(IndexError):
+        page[3]
+    with pytest.raises(IndexError):
+        page[-4]
+
+
+def test_slice_only_builds_slice():
+    page = SubmissionPage([_submission_data(num) for num in range(100)])
+
+    sliced = page[48:50]
+
+    assert [submission.submission_id for submission in sliced] == ["48", "49"]
+    assert sum(1 for submission in page._submissions if submission is not None) == 2
+    assert [submission.submission_id for submission in page[::-1][:2]] == ["99", "98"]
+
+
+def test_sequence_behaviour():
+    page = SubmissionPage([_submission_data(num) for num in range(3)])
+
+    assert len(page) == 3
+    assert [submission.submission_id for submission in page] == ["0", "1", "2"]
+    assert page[0] in page
+    assert page == [page[0], page[1], page[2]]
+    assert SubmissionPage([]) == []
+
+
+def test_favs_page():
+    page = SubmissionPage([_submission_data(1, fav_id="456"), _submission_data(2, fav_id="455")])
+
+    assert isinstance(page[0], FASubmissionShortFav)
+    assert page[-1].fav_id == "455"
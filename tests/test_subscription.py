@@ -1,7 +1,7 @@
 import datetime
 
 from fa_submission import Rating
-from subscription_watcher import Subscription
+from subscription_watcher import Subscription, CompiledQuery, CompiledBlocklist
 from tests.util.submission_builder import SubmissionBuilder
 
 
@@ -16,6 +16,52 @@ def test_init():
     assert sub.latest_update is None
 
 
+def test_init__compiles_query():
+    sub = Subscription("Deer -Lion rating:general", 12432)
+
+    assert sub.compiled_query.positive_words == frozenset({"deer"})
+    assert sub.compiled_query.negative_words == frozenset({"lion"})
+    assert sub.compiled_query.allowed_ratings == frozenset({Rating.GENERAL})
+
+
+def test_compiled_query__no_rating():
+    compiled = CompiledQuery.from_query("deer forest")
+
+    assert compiled.positive_words == frozenset({"deer", "forest"})
+    assert compiled.negative_words == frozenset()
+    assert compiled.allowed_ratings == frozenset({Rating.GENERAL, Rating.MATURE, Rating.ADULT})
+
+
+def test_compiled_query__negative_ratings():
+    compiled = CompiledQuery.from_query("deer -rating:general -rating:explicit")
+
+    assert compiled.positive_words == frozenset({"deer"})
+    assert compiled.allowed_ratings == frozenset({Rating.MATURE})
+
+
+def test_compiled_query__unknown_rating_ignored():
+    compiled = CompiledQuery.from_query("deer rating:unknown")
+
+    assert compiled.positive_words == frozenset({"deer"})
+    assert compiled.allowed_ratings == frozenset({Rating.GENERAL, Rating.MATURE, Rating.ADULT})
+
+
+def test_compiled_query__conflicting_ratings():
+    compiled = CompiledQuery.from_query("deer rating:general -rating:adult")
+
+    assert compiled.allowed_ratings == frozenset({Rating.GENERAL})
+
+
+def test_compiled_query__immutable():
+    compiled = CompiledQuery.from_query("deer")
+
+    try:
+        compiled.positive_words = frozenset({"lion"})
+        assert False, "Should have thrown exception"
+    except AttributeError:
+        pass
+
+
 def test_matches_result__one_word_in_title_matches():
     query = "test"
     subscription = Subscription(query, 12432)
@@ -366,6 +412,37 @@ def test_matches_result__doesnt_match_blocklisted_tag():
     assert not match
 
 
+def test_matches_result__doesnt_match_blocklisted_rating():
+    subscription = Subscription("deer", 12432)
+    submission = SubmissionBuilder(
+        title="Deer plays in woods",
+        rating=Rating.ADULT
+    ).build_full_submission()
+
+    match = subscription.matches_result(submission, {"rating:adult"})
+
+    assert not match
+
+
+def test_matches_result__matches_other_rating_than_blocklisted_rating():
+    subscription = Subscription("deer", 12432)
+    submission = SubmissionBuilder(
+        title="Deer plays in woods",
+        rating=Rating.GENERAL
+    ).build_full_submission()
+
+    match = subscription.matches_result(submission, CompiledBlocklist.from_tags({"rating:adult"}))
+
+    assert match
+
+
+def test_compiled_blocklist__splits_ratings_from_words():
+    blocklist = CompiledBlocklist.from_tags({"ych", "rating:explicit", "rating:mature", "rating:unknown"})
+
+    assert blocklist.words == {"ych"}
+    assert blocklist.blocked_ratings == {Rating.ADULT, Rating.MATURE}
+
+
 def test_matches_word_in_quotes():
     query = "deer"
     subscription = Subscription(query, 12432)
@@ -533,6 +610,7 @@ def test_from_json_no_update():
     assert sub.query == "example query"
     assert sub.destination == 17839
     assert sub.latest_update is None
+    assert sub.compiled_query.positive_words == frozenset({"example", "query"})
 
 
 def test_from_json():
@@ -0,0 +1,61 @@
+from subscription_watcher import Subscription, SubscriptionIndex
+from tests.util.submission_builder import SubmissionBuilder
+
+
+def test_candidates__indexed_by_positive_word():
+    submission = SubmissionBuilder(title="Deer plush", description="A stuffed toy", keywords=["toy"]) \
+        .build_full_submission()
+    sub_match = Subscription("deer", 12432)
+    sub_no_match = Subscription("otter", 12432)
+    index = SubscriptionIndex([sub_match, sub_no_match])
+
+    candidates = index.candidates(submission)
+
+    assert candidates == [sub_match]
+
+
+def test_candidates__indexed_by_one_word():
+    submission = SubmissionBuilder(title="Deer plush", description="A stuffed toy", keywords=["toy"]) \
+        .build_full_submission()
+    subscription = Subscription("deer plush toy", 12432)
+    index = SubscriptionIndex([subscription])
+
+    candidates = index.candidates(submission)
+
+    assert candidates == [subscription]
+    assert sum(len(subs) for subs in index.by_word.values()) == 1
+
+
+def test_candidates__ignores_negative_words_and_ratings():
+    submission = SubmissionBuilder(title="Deer plush", description="A stuffed toy", keywords=["toy"]) \
+        .build_full_submission()
+    subscription = Subscription("-otter rating:general Plush", 12432)
+    index = SubscriptionIndex([subscription])
+
+    candidates = index.candidates(submission)
+
+    assert candidates == [subscription]
+    assert list(index.by_word.keys()) == ["plush"]
+
+
+def test_candidates__only_negative_words_always_candidate():
+    submission = SubmissionBuilder(title="Deer plush", description="A stuffed toy", keywords=["toy"]) \
+        .build_full_submission()
+    subscription = Subscription("-deer rating:adult", 12432)
+    index = SubscriptionIndex([subscription])
+
+    candidates = index.candidates(submission)
+
+    assert candidates == [subscription]
+    assert index.unindexed == [subscription]
+
+
+def test_candidates__punctuation_and_case():
+    submission = SubmissionBuilder(title="\"Deer!\"", description="Some <b>plush</b>", keywords=["Toy"]) \
+        .build_full_submission()
+    subscriptions = [Subscription("deer", 1), Subscription("plush", 2), Subscription("toy", 3)]
+    index = SubscriptionIndex(subscriptions)
+
+    candidates = index.candidates(submission)
+
+    assert set(candidates) == set(subscriptions)
@@ -0,0 +1,87 @@
+from threading import Thread
+
+from subscription_watcher import SubscriptionRegistry, Subscription
+
+
+def test_for_destination():
+    subscriptions = SubscriptionRegistry([Subscription("example", 1234), Subscription("test", 5678)])
+    subscriptions.add(Subscription("deer", 1234))
+
+    assert set(subscriptions.for_destination(1234)) == {Subscription("example", 1234), Subscription("deer", 1234)}
+    assert subscriptions.for_destination(5678) == {Subscription("test", 5678)}
+    assert subscriptions.for_destination(9012) == set()
+
+
+def test_remove_updates_destination_index():
+    subscriptions = SubscriptionRegistry([Subscription("example", 1234), Subscription("test", 1234)])
+
+    subscriptions.remove(Subscription("example", 1234))
+
+    assert subscriptions.for_destination(1234) == {Subscription("test", 1234)}
+    assert len(subscriptions) == 1
+
+
+def test_remove__missing_raises_key_error():
+    subscriptions = SubscriptionRegistry([Subscription("example", 1234)])
+
+    try:
+        subscriptions.remove(Subscription("example", 5678))
+        assert False, "Should have raised KeyError"
+    except KeyError:
+        pass
+    assert subscriptions == {Subscription("example", 1234)}
+
+
+def test_discard__removes_empty_destination():
+    subscriptions = SubscriptionRegistry([Subscription("example", 1234)])
+
+    subscriptions.discard(Subscription("example", 1234))
+    subscriptions.discard(Subscription("example", 1234))
+
+    assert subscriptions == set()
+    assert subscriptions.snapshot().by_destination == {}
+
+
+def test_concurrent_changes_stay_in_step():
+    subscriptions = SubscriptionRegistry()
+
+    def add_and_remove(destination):
+        for num in range(200):
+            subscriptions.add(Subscription(f"query{num}", destination))
+        for num in range(0, 200, 2):
+            subscriptions.remove(Subscription(f"query{num}", destination))
+
+    threads = [Thread(target=add_and_remove, args=(destination,)) for destination in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(subscriptions) == 8 * 100
+    for destination in range(8):
+        assert len(subscriptions.for_destination(destination)) == 100
+
+
+def test_snapshot__is_versioned_and_unchanged_by_writes():
+    subscriptions = SubscriptionRegistry([Subscription("example", 1234)])
+    snapshot = subscriptions.snapshot()
+
+    subscriptions.add(Subscription("test", 1234))
+    subscriptions.remove(Subscription("example", 1234))
+
+    assert snapshot.version == 0
+    assert snapshot.subscriptions == {Subscription("example", 1234)}
+    assert snapshot.by_destination == {1234: {Subscription("example", 1234)}}
+    new_snapshot = subscriptions.snapshot()
+    assert new_snapshot.version == 2
+    assert new_snapshot.subscriptions == {Subscription("test", 1234)}
+
+
+def test_snapshot__unchanged_without_changes():
+    subscriptions = SubscriptionRegistry([Subscription("example", 1234)])
+    snapshot = subscriptions.snapshot()
+
+    subscriptions.add(Subscription("example", 1234))
+    subscriptions.discard(Subscription("test", 1234))
+
+    assert subscriptions.snapshot() is snapshot
@@ -9,12 +9,19 @@ from typing import List
 
 from unittest.mock import patch
 import telegram
-
-from fa_submission import FASubmissionFull
-from subscription_watcher import SubscriptionWatcher, Subscription
+from telegram.error import TimedOut
+from telegram.utils.promise import Promise
+
+from fa_submission import FASubmissionFull, Rating
+from file_id_cache import FileIdCache
+from retry_policy import CircuitOpen
+from write_ahead_log import WriteAheadLog
+from submission_page import SubmissionPage
+from subscription_watcher import SubscriptionWatcher, Subscription, SubscriptionRegistry
 from tests.util.mock_export_api import MockExportAPI, MockSubmission
 from tests.util.mock_method import MockMethod
 from tests.util.submission_builder import SubmissionBuilder
+from update_batcher import UpdateBatcher, PendingUpdate
 
 
 class MockSubscription(Subscription):
@@ -133,7 +140,7 @@ class SubscriptionWatcherTest(unittest.TestCase):
 
     @patch.object(telegram, "Bot")
     def test_run__checks_all_subscriptions(self, bot):
-        submission = MockSubmission("12322")
+        submission = MockSubmission("12322", keywords=["deer", "dog"])
         api = MockExportAPI().with_submission(submission)
         watcher = SubscriptionWatcher(api, bot)
         method_called = MockMethod([submission])
@@ -141,7 +148,7 @@ class SubscriptionWatcherTest(unittest.TestCase):
         watcher.BACK_OFF = 1
         sub1 = MockSubscription("deer", 0)
         sub2 = MockSubscription("dog", 0)
-        watcher.subscriptions = [sub1, sub2]
+        watcher.subscriptions = SubscriptionRegistry([sub1, sub2])
 
         thread = Thread(target=lambda: self.watcher_killer(watcher))
         thread.start()
@@ -153,17 +160,59 @@ class SubscriptionWatcherTest(unittest.TestCase):
         assert submission in sub2.submissions_checked
         assert method_called.called
 
+    @patch.object(telegram, "Bot")
+    def test_run__only_checks_candidate_subscriptions(self, bot):
+        submission = MockSubmission("12322", title="A deer", keywords=["forest"])
+        api = MockExportAPI().with_submission(submission)
+        watcher = SubscriptionWatcher(api, bot)
+        method_called = MockMethod([submission])
+        watcher._get_new_results = method_called.call
+        watcher.BACK_OFF = 1
+        sub1 = MockSubscription("deer forest", 0)
+        sub2 = MockSubscription("dog", 0)
+        sub3 = MockSubscription("-cat", 0)
+        watcher.subscriptions = SubscriptionRegistry([sub1, sub2, sub3])
+
+        thread = Thread(target=lambda: self.watcher_killer(watcher))
+        thread.start()
+        # Run watcher
+        watcher.run()
+        thread.join()
+
+        assert submission in sub1.submissions_checked
+        assert submission not in sub2.submissions_checked
+        assert submission in sub3.submissions_checked
+
+    @patch.object(telegram, "Bot")
+    def test_subscription_index__rebuilt_only_when_subscriptions_change(self, bot):
+        api = MockExportAPI()
+        watcher = SubscriptionWatcher(api, bot)
+        watcher.change_log = WriteAheadLog("./test_subscription_watcher.log.jsonl")
+        watcher.subscriptions.add(Subscription("deer", 0))
+
+        try:
+            index = watcher._subscription_index()
+            assert watcher._subscription_index() is index
+
+            watcher.add_subscription(Subscription("dog", 0))
+            new_index = watcher._subscription_index()
+
+            assert new_index is not index
+            assert set(new_index.by_word.keys()) == {"deer", "dog"}
+        finally:
+            os.remove(watcher.change_log.filename)
+
     @patch.object(telegram, "Bot")
     def test_run__checks_all_new_results(self, bot):
-        submission1 = MockSubmission("12322")
-        submission2 = MockSubmission("12324")
+        submission1 = MockSubmission("12322", keywords=["deer"])
+        submission2 = MockSubmission("12324", keywords=["deer"])
         api = MockExportAPI().with_submissions([submission1, submission2])
         watcher = SubscriptionWatcher(api, bot)
         method_called = MockMethod([submission1, submission2])
         watcher._get_new_results = method_called.call
         watcher.BACK_OFF = 1
         sub = MockSubscription("deer", 0)
-        watcher.subscriptions = [sub]
+        watcher.subscriptions = SubscriptionRegistry([sub])
 
         thread = Thread(target=lambda: self.watcher_killer(watcher))
         thread.start()
@@ -219,7 +268,7 @@ class SubscriptionWatcherTest(unittest.TestCase):
         watcher._send_update = lambda *args: (_ for _ in ()).throw(Exception)
         watcher.BACK_OFF = 3
         sub1 = MockSubscription("deer", 0)
-        watcher.subscriptions = [sub1]
+        watcher.subscriptions = SubscriptionRegistry([sub1])
 
         api.call_after_x_browse = (lambda: watcher.stop(), 2)
         # Run watcher
@@ -230,9 +279,222 @@ class SubscriptionWatcherTest(unittest.TestCase):
         time_waited = end_time - start_time
         assert 3 <= time_waited.seconds <= 5
 
+    @patch.object(telegram, "Bot")
+    def test_run__circuit_open_leaves_results_for_next_check(self, bot):
+        submission1 = MockSubmission("12322")
+        submission2 = MockSubmission("12324")
+        api = MockExportAPI().with_submissions([submission1, submission2])
+
+        def circuit_open(*args):
+            raise CircuitOpen("FA API is unavailable")
+        api.get_full_submission = circuit_open
+        watcher = SubscriptionWatcher(api, bot)
+        watcher._get_new_results = MockMethod([submission1, submission2]).call
+        mock_update_latest = MockMethod()
+        watcher._update_latest_ids = mock_update_latest.call
+        watcher.BACK_OFF = 1
+
+        thread = Thread(target=lambda: self.watcher_killer(watcher))
+        thread.start()
+        # Run watcher
+        watcher.run()
+        thread.join()
+
+        assert not mock_update_latest.called
+
+    @patch.object(telegram, "Bot")
+    def test_run__fetches_full_submissions_concurrently_in_order(self, bot):
+        submissions = [MockSubmission(str(12300 + x), keywords=["deer"]) for x in range(8)]
+        api = MockExportAPI().with_submissions(submissions)
+        get_full_submission = api.get_full_submission
+
+        def slow_get_full_submission(*args):
+            time.sleep(0.3)
+            return get_full_submission(*args)
+        api.get_full_submission = slow_get_full_submission
+        watcher = SubscriptionWatcher(api, bot)
+        watcher._get_new_results = MockMethod(submissions).call
+        updated_ids = []
+        watcher._update_latest_ids = lambda results: updated_ids.extend(x.submission_id for x in results)
+        watcher.BACK_OFF = 1
+        sub = MockSubscription("deer", 0)
+        watcher.subscriptions = SubscriptionRegistry([sub])
+
+        start_time = datetime.datetime.now()
+        thread = Thread(target=lambda: self.watcher_killer(watcher))
+        thread.start()
+        # Run watcher
+        watcher.run()
+        thread.join()
+        end_time = datetime.datetime.now()
+
+        assert (end_time - start_time).total_seconds() < 1.5
+        assert sub.submissions_checked == submissions
+        assert updated_ids == [x.submission_id for x in submissions]
+
+    @patch.object(telegram, "Bot")
+    def test_fetch_full_results__fetches_limited_number_ahead(self, bot):
+        submissions = [MockSubmission(str(12300 + x)) for x in range(10)]
+        api = MockExportAPI().with_submissions(submissions)
+        fetched = []
+        get_full_submission = api.get_full_submission
+
+        def recording_get_full_submission(submission_id, *args):
+            fetched.append(submission_id)
+            return get_full_submission(submission_id, *args)
+        api.get_full_submission = recording_get_full_submission
+        watcher = SubscriptionWatcher(api, bot)
+        watcher.FETCH_AHEAD = 3
+
+        results = watcher._fetch_full_results(submissions)
+        result, future = next(results)
+        future.result()
+        time.sleep(0.1)
+
+        assert result == submissions[0]
+        assert len(fetched) <= 4
+        results.close()
+
+    @patch.object(telegram, "Bot")
+    def test_run__sends_matches_through_delivery_queue(self, bot):
+        submission = MockSubmission("12322", keywords=["deer"])
+        api = MockExportAPI().with_submission(submission)
+        watcher = SubscriptionWatcher(api, bot)
+        watcher._get_new_results = MockMethod([submission]).call
+        sent = []
+        watcher._send_update = lambda subscriptions, result: sent.append((subscriptions, result))
+        watcher.BACK_OFF = 1
+        sub = MockSubscription("deer", 0)
+        watcher.subscriptions = SubscriptionRegistry([sub])
+
+        thread = Thread(target=lambda: self.watcher_killer(watcher))
+        thread.start()
+        # Run watcher
+        watcher.run()
+        thread.join()
+
+        assert sent == [([sub], submission)]
+        assert watcher.delivery_queue.pending() == 0
+
+    @patch.object(telegram, "Bot")
+    def test_run__sends_one_update_per_destination(self, bot):
+        submission = MockSubmission("12322", keywords=["fox"], rating=Rating.GENERAL)
+        api = MockExportAPI().with_submission(submission)
+        watcher = SubscriptionWatcher(api, bot)
+        watcher._get_new_results = MockMethod([submission]).call
+        sent = []
+        watcher._send_update = lambda subscriptions, result: sent.append((subscriptions, result))
+        watcher.BACK_OFF = 1
+        sub1 = Subscription("fox", 0)
+        sub2 = Subscription("fox rating:general", 0)
+        sub3 = Subscription("fox", 1)
+        watcher.subscriptions = SubscriptionRegistry([sub1, sub2, sub3])
+
+        thread = Thread(target=lambda: self.watcher_killer(watcher))
+        thread.start()
+        # Run watcher
+        watcher.run()
+        thread.join()
+
+        assert len(sent) == 2
+        sent_by_destination = {subscriptions[0].destination: set(subscriptions) for subscriptions, _ in sent}
+        assert sent_by_destination == {0: {sub1, sub2}, 1: {sub3}}
+
+    @patch.object(telegram, "Bot")
+    def test_run__batches_matches_when_batcher_set(self, bot):
+        submission1 = MockSubmission("12322", keywords=["deer"])
+        submission2 = MockSubmission("12323", keywords=["deer"])
+        api = MockExportAPI().with_submissions([submission1, submission2])
+        watcher = SubscriptionWatcher(api, bot)
+        watcher._get_new_results = MockMethod([submission1, submission2]).call
+        watcher.batcher = UpdateBatcher(UpdateBatcher.DIGEST, 600)
+        sent = []
+        watcher._send_batch = lambda destination, updates, continued: sent.append((destination, updates))
+        watcher._send_update = lambda subscriptions, result: self.fail("Updates should be batched")
+        watcher.BACK_OFF = 1
+        sub = MockSubscription("deer", 0)
+        watcher.subscriptions = SubscriptionRegistry([sub])
+
+        thread = Thread(target=lambda: self.watcher_killer(watcher))
+        thread.start()
+        # Run watcher
+        watcher.run()
+        thread.join()
+
+        # Flush window hasn't passed, but stopping sends everything waiting
+        assert len(sent) == 1
+        assert sent[0][0] == 0
+        assert [update.result for update in sent[0][1]] == [submission1, submission2]
+        assert watcher.batcher.flush_all() == []
+
+    @patch.object(telegram, "Bot")
+    def test_run__digest_mode_does_not_probe_file_sizes(self, bot):
+        submission = MockSubmission("12322", keywords=["deer"])
+        api = MockExportAPI().with_submission(submission)
+        watcher = SubscriptionWatcher(api, bot)
+        watcher._get_new_results = MockMethod([submission]).call
+        watcher.batcher = UpdateBatcher(UpdateBatcher.DIGEST, 600)
+        watcher._send_batch = lambda destination, updates, continued: None
+        watcher.BACK_OFF = 1
+        watcher.subscriptions = SubscriptionRegistry([Subscription("deer", 0)])
+
+        thread = Thread(target=lambda: self.watcher_killer(watcher))
+        thread.start()
+        with patch.object(FASubmissionFull, "start_file_size_probe") as start_file_size_probe:
+            watcher.run()
+        thread.join()
+
+        start_file_size_probe.assert_not_called()
+
+    @patch.object(telegram, "Bot")
+    def test_send_batch__records_deliveries(self, bot):
+        api = MockExportAPI()
+        watcher = SubscriptionWatcher(api, bot)
+        watcher.batcher = UpdateBatcher(UpdateBatcher.DIGEST, 600)
+        subscription = Subscription("test", 12345)
+        submission = SubmissionBuilder().build_mock_submission()
+
+        watcher._send_batch(12345, [PendingUpdate([subscription], submission)])
+
+        bot.send_message.assert_called_once()
+        assert subscription.latest_update is not None
+
+    @patch.object(telegram, "Bot")
+    def test_flush_batches__retries_only_the_failed_album(self, bot):
+        bot.send_media_group.side_effect = [None, TimedOut(), None]
+        api = MockExportAPI()
+        watcher = SubscriptionWatcher(api, bot)
+        watcher.batcher = UpdateBatcher(UpdateBatcher.ALBUM, 600)
+        watcher.delivery_queue.RETRY_DELAY = 0.01
+        for _ in range(12):
+            submission = SubmissionBuilder(file_ext="jpg", file_size=1000).build_full_submission()
+            watcher.batcher.add(12345, PendingUpdate([Subscription("test", 12345)], submission))
+        watcher.delivery_queue.start()
+
+        watcher._flush_batches(flush_all=True)
+        watcher.delivery_queue.join()
+        watcher.delivery_queue.stop()
+
+        albums = [len(call[1]['media']) for call in bot.send_media_group.call_args_list]
+        assert albums == [10, 2, 2]
+        assert len(watcher.delivery_queue.dead_letters) == 0
+
+    @patch.object(telegram, "Bot")
+    def test_send_batch__digest_does_not_fetch_file_sizes(self, bot):
+        api = MockExportAPI()
+        watcher = SubscriptionWatcher(api, bot)
+        watcher.batcher = UpdateBatcher(UpdateBatcher.DIGEST, 600)
+        submission = SubmissionBuilder().build_full_submission()
+
+        with patch.object(FASubmissionFull, "fetch_file_sizes") as fetch_file_sizes:
+            watcher._send_batch(12345, [PendingUpdate([Subscription("test", 12345)], submission)])
+
+        fetch_file_sizes.assert_not_called()
+        bot.send_message.assert_called_once()
+
     @patch.object(telegram, "Bot")
     def test_run__passes_correct_blocklists_to_subscriptions(self, bot):
-        submission = MockSubmission("12322")
+        submission = MockSubmission("12322", keywords=["deer", "dog"])
         api = MockExportAPI().with_submission(submission)
         watcher = SubscriptionWatcher(api, bot)
         method_called = MockMethod([submission])
@@ -244,7 +506,7 @@ class SubscriptionWatcherTest(unittest.TestCase):
         }
         sub1 = MockSubscription("deer", 156)
         sub2 = MockSubscription("dog", -232)
-        watcher.subscriptions = [sub1, sub2]
+        watcher.subscriptions = SubscriptionRegistry([sub1, sub2])
 
         thread = Thread(target=lambda: self.watcher_killer(watcher))
         thread.start()
@@ -254,12 +516,10 @@ class SubscriptionWatcherTest(unittest.TestCase):
 
         assert submission in sub1.submissions_checked
         assert len(sub1.blocklists) == 1
-        assert len(sub1.blocklists[0]) == 2
-        assert "test" in sub1.blocklists[0]
-        assert "ych" in sub1.blocklists[0]
+        assert sub1.blocklists[0].words == {"test", "ych"}
         assert submission in sub2.submissions_checked
         assert len(sub2.blocklists) == 1
-        assert len(sub2.blocklists[0]) == 0
+        assert len(sub2.blocklists[0].words) == 0
         assert method_called.called
 
     @patch.object(telegram, "Bot")
@@ -291,6 +551,23 @@ class SubscriptionWatcherTest(unittest.TestCase):
         assert results[0].submission_id == "1222"
         assert results[1].submission_id == "1223"
 
+    @patch.object(telegram, "Bot")
+    def test_get_new_results__only_builds_new_submissions(self, bot):
+        api = MockExportAPI()
+        page = SubmissionPage([
+            {"id": str(submission_id), "thumbnail": "", "title": "", "name": "", "profile_name": ""}
+            for submission_id in ["1223", "1222", "1220", "1219", "1218"]
+        ])
+        api.browse_results[1] = page
+        watcher = SubscriptionWatcher(api, bot)
+        watcher.latest_ids.append("1220")
+        watcher.running = True
+
+        results = watcher._get_new_results()
+
+        assert [result.submission_id for result in results] == ["1222", "1223"]
+        assert page._submissions[2:] == [None, None, None]
+
     @patch.object(telegram, "Bot")
     def test_get_new_results__goes_to_another_page(self, bot):
         api = MockExportAPI()
@@ -338,11 +615,32 @@ class SubscriptionWatcherTest(unittest.TestCase):
         submissions = [MockSubmission(x) for x in id_list]
         mock_save_json = MockMethod()
         watcher.save_to_json = mock_save_json.call
+        watcher.change_log = WriteAheadLog("./test_subscription_watcher.log.jsonl")
 
-        watcher._update_latest_ids(submissions)
+        try:
+            watcher._update_latest_ids(submissions)
 
-        assert list(watcher.latest_ids) == id_list
-        assert mock_save_json.called
+            assert list(watcher.latest_ids) == id_list
+            assert not mock_save_json.called
+            assert list(watcher.change_log.read()) == [{"type": "latest_id", "id": x} for x in id_list]
+        finally:
+            os.remove(watcher.change_log.filename)
+
+    @patch.object(telegram, "Bot")
+    def test_update_latest_ids__compacts_log(self, bot):
+        api = MockExportAPI()
+        watcher = SubscriptionWatcher(api, bot)
+        watcher.COMPACT_AFTER_CHANGES = 3
+        mock_save_json = MockMethod()
+        watcher.save_to_json = mock_save_json.call
+        watcher.change_log = WriteAheadLog("./test_subscription_watcher.log.jsonl")
+
+        try:
+            watcher._update_latest_ids([MockSubmission(x) for x in ["1234", "1233", "1230"]])
+
+            assert mock_save_json.called
+        finally:
+            os.remove(watcher.change_log.filename)
 
     @patch.object(telegram, "Bot")
     def test_send_update__sends_message(self, bot):
@@ -351,7 +649,7 @@ class SubscriptionWatcherTest(unittest.TestCase):
         subscription = Subscription("test", 12345)
         submission = SubmissionBuilder().build_mock_submission()
 
-        watcher._send_update(subscription, submission)
+        watcher._send_update([subscription], submission)
 
         bot.send_message.assert_not_called()
         bot.send_photo.assert_called_once()
@@ -370,8 +668,54 @@ class SubscriptionWatcherTest(unittest.TestCase):
         subscription = Subscription("test", 12345)
         submission = SubmissionBuilder().build_mock_submission()
 
-        watcher._send_update(subscription, submission)
+        watcher._send_update([subscription], submission)
+
+        assert subscription.latest_update is not None
+
+    @patch.object(telegram, "Bot")
+    def test_send_update__lists_all_matched_queries(self, bot):
+        api = MockExportAPI()
+        watcher = SubscriptionWatcher(api, bot)
+        subscription1 = Subscription("fox", 12345)
+        subscription2 = Subscription("fox rating:general", 12345)
+        submission = SubmissionBuilder().build_mock_submission()
+
+        watcher._send_update([subscription1, subscription2], submission)
+
+        bot.send_photo.assert_called_once()
+        caption = bot.send_photo.call_args[1]['caption']
+        assert "\"fox\", \"fox rating:general\" subscriptions" in caption
+        assert subscription1.latest_update is not None
+        assert subscription2.latest_update is not None
+
+    @patch.object(telegram, "Bot")
+    def test_queue_update__retries_errors_from_message_queue_promises(self, bot):
+        attempts = []
+
+        def send_later():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise TimedOut()
+
+        def send_photo(**kwargs):
+            # Like the message queue, return straight away, and send on another thread
+            promise = Promise(send_later, [], {})
+            Thread(target=promise.run).start()
+            return promise
+        bot.send_photo = send_photo
+        api = MockExportAPI()
+        watcher = SubscriptionWatcher(api, bot)
+        watcher.delivery_queue.RETRY_DELAY = 0.01
+        subscription = Subscription("test", 12345)
+        submission = SubmissionBuilder().build_mock_submission()
+        watcher.delivery_queue.start()
+
+        watcher._queue_update([subscription], submission)
+        watcher.delivery_queue.join()
+        watcher.delivery_queue.stop()
 
+        assert len(attempts) == 2
+        assert len(watcher.delivery_queue.dead_letters) == 0
         assert subscription.latest_update is not None
 
     @patch.object(telegram, "Bot")
@@ -573,3 +917,174 @@ class SubscriptionWatcherTest(unittest.TestCase):
         finally:
             SubscriptionWatcher.FILENAME = old_filename
             os.remove(test_watcher_file)
+
+    @patch.object(telegram, "Bot")
+    def test_save_file_ids__saves_when_interval_has_passed(self, bot):
+        api = MockExportAPI()
+        watcher = SubscriptionWatcher(api, bot)
+        watcher.file_id_cache = FileIdCache(10)
+        mock_save = MockMethod()
+        watcher.file_id_cache.save_to_json = mock_save.call
+
+        watcher._save_file_ids()
+        assert not mock_save.called
+
+        watcher._file_ids_saved_at -= watcher.FILE_ID_SAVE_INTERVAL
+        watcher._save_file_ids()
+        assert mock_save.called
+
+        mock_save.called = False
+        watcher._save_file_ids()
+        assert not mock_save.called
+
+    @patch.object(telegram, "Bot")
+    def test_save_to_json__clears_change_log(self, bot):
+        test_watcher_file = "./test_subscription_watcher.json"
+        old_filename = SubscriptionWatcher.FILENAME
+        SubscriptionWatcher.FILENAME = test_watcher_file
+        api = MockExportAPI()
+        watcher = SubscriptionWatcher(api, bot)
+        watcher.add_subscription(Subscription("query", 1234))
+
+        try:
+            assert os.path.exists(watcher.change_log.filename)
+
+            watcher.save_to_json()
+
+            assert os.path.exists(test_watcher_file)
+            assert not os.path.exists(watcher.change_log.filename)
+            assert watcher.change_log.entries == 0
+        finally:
+            SubscriptionWatcher.FILENAME = old_filename
+            os.remove(test_watcher_file)
+
+    @patch.object(telegram, "Bot")
+    def test_load_from_json__replays_change_log(self, bot):
+        test_watcher_file = "./test_subscription_watcher.json"
+        old_filename = SubscriptionWatcher.FILENAME
+        SubscriptionWatcher.FILENAME = test_watcher_file
+        api = MockExportAPI()
+        watcher = SubscriptionWatcher(api, bot)
+        watcher.add_subscription(Subscription("query", 1234))
+        watcher.add_subscription(Subscription("example", 5678))
+        watcher.add_to_blocklist(1234, "ych")
+        watcher.save_to_json()
+        # Changes after the snapshot
+        watcher._update_latest_ids([MockSubmission("123243"), MockSubmission("123244")])
+        watcher.remove_subscription(Subscription("example", 5678))
+        watcher.add_subscription(Subscription("test", 5678))
+        watcher.add_to_blocklist(5678, "example")
+        watcher.remove_from_blocklist(1234, "ych")
+
+        try:
+            new_watcher = SubscriptionWatcher.load_from_json(api, bot)
+
+            assert list(new_watcher.latest_ids) == ["123243", "123244"]
+            assert new_watcher.subscriptions == {Subscription("query", 1234), Subscription("test", 5678)}
+            assert new_watcher.blocklists == {1234: set(), 5678: {"example"}}
+            # Replayed changes are compacted into a new snapshot
+            assert not os.path.exists(new_watcher.change_log.filename)
+            with open(test_watcher_file, "r") as f:
+                data = json.load(f)
+            assert len(data["subscriptions"]) == 2
+        finally:
+            SubscriptionWatcher.FILENAME = old_filename
+            os.remove(test_watcher_file)
+
+    @patch.object(telegram, "Bot")
+    def test_load_from_json__replays_latest_update(self, bot):
+        test_watcher_file = "./test_subscription_watcher.json"
+        old_filename = SubscriptionWatcher.FILENAME
+        SubscriptionWatcher.FILENAME = test_watcher_file
+        api = MockExportAPI()
+        watcher = SubscriptionWatcher(api, bot)
+        subscription = Subscription("query", 1234)
+        watcher.add_subscription(subscription)
+        watcher.save_to_json()
+        # Delivery after the snapshot
+        watcher._record_delivery([subscription], MockSubmission("123243"))
+
+        try:
+            new_watcher = SubscriptionWatcher.load_from_json(api, bot)
+
+            assert subscription.latest_update is not None
+            new_subscription = list(new_watcher.subscriptions)[0]
+            assert new_subscription.latest_update == subscription.latest_update
+        finally:
+            SubscriptionWatcher.FILENAME = old_filename
+            os.remove(test_watcher_file)
+
+    @patch.object(telegram, "Bot")
+    def test_load_from_json__replays_change_log_without_snapshot(self, bot):
+        test_watcher_file = "./test_subscription_watcher.json"
+        old_filename = SubscriptionWatcher.FILENAME
+        SubscriptionWatcher.FILENAME = test_watcher_file
+        api = MockExportAPI()
+        watcher = SubscriptionWatcher(api, bot)
+        watcher.add_subscription(Subscription("query", 1234))
+
+        try:
+            new_watcher = SubscriptionWatcher.load_from_json(api, bot)
+
+            assert new_watcher.subscriptions == {Subscription("query", 1234)}
+        finally:
+            SubscriptionWatcher.FILENAME = old_filename
+            os.remove(test_watcher_file)
+
+    @patch.object(telegram, "Bot")
+    def test_load_from_sqlite__reloads_changes(self, bot):
+        test_watcher_file = "./test_subscription_watcher.json"
+        test_db_file = "./test_subscription_watcher.sqlite"
+        old_filename = SubscriptionWatcher.FILENAME
+        SubscriptionWatcher.FILENAME = test_watcher_file
+        api = MockExportAPI()
+        watcher = SubscriptionWatcher.load_from_sqlite(api, bot, test_db_file)
+
+        try:
+            watcher.add_subscription(Subscription("query", 1234))
+            watcher.add_subscription(Subscription("example", 5678))
+            watcher.remove_subscription(Subscription("example", 5678))
+            watcher.add_to_blocklist(1234, "ych")
+            watcher._update_latest_ids([MockSubmission("123243"), MockSubmission("123244")])
+            watcher.store.close()
+
+            new_watcher = SubscriptionWatcher.load_from_sqlite(api, bot, test_db_file)
+            new_watcher.store.close()
+
+            assert list(new_watcher.latest_ids) == ["123243", "123244"]
+            assert new_watcher.subscriptions == {Subscription("query", 1234)}
+            assert new_watcher.blocklists == {1234: {"ych"}}
+            assert not os.path.exists(watcher.change_log.filename)
+        finally:
+            SubscriptionWatcher.FILENAME = old_filename
+            for suffix in ["", "-wal", "-shm"]:
+                if os.path.exists(test_db_file + suffix):
+                    os.remove(test_db_file + suffix)
+
+    @patch.object(telegram, "Bot")
+    def test_load_from_sqlite__imports_json(self, bot):
+        test_watcher_file = "./test_subscription_watcher.json"
+        test_db_file = "./test_subscription_watcher.sqlite"
+        old_filename = SubscriptionWatcher.FILENAME
+        SubscriptionWatcher.FILENAME = test_watcher_file
+        api = MockExportAPI()
+        watcher = SubscriptionWatcher(api, bot)
+        watcher.add_subscription(Subscription("query", 1234))
+        watcher.add_to_blocklist(1234, "ych")
+        watcher._update_latest_ids([MockSubmission("123243")])
+        watcher.save_to_json()
+
+        try:
+            new_watcher = SubscriptionWatcher.load_from_sqlite(api, bot, test_db_file)
+
+            assert list(new_watcher.latest_ids) == ["123243"]
+            assert new_watcher.subscriptions == {Subscription("query", 1234)}
+            assert new_watcher.subscription_queries(1234) == ["query"]
+            assert new_watcher.blocklist(1234) == {"ych"}
+            new_watcher.store.close()
+        finally:
+            SubscriptionWatcher.FILENAME = old_filename
+            os.remove(test_watcher_file)
+            for suffix in ["", "-wal", "-shm"]:
+                if os.path.exists(test_db_file + suffix):
+                    os.remove(test_db_file + suffix)
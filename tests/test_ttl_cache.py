@@ -0,0 +1,82 @@
+import time
+
+from ttl_cache import TTLCache
+
+
+def test_get__missing_key():
+    cache = TTLCache(10, 60)
+
+    assert cache.get("missing") is None
+    assert cache.misses == 1
+    assert cache.hits == 0
+
+
+def test_put_and_get():
+    cache = TTLCache(10, 60)
+
+    cache.put("key", "value")
+
+    assert cache.get("key") == "value"
+    assert "key" in cache
+    assert len(cache) == 1
+    assert cache.hits == 1
+    assert cache.misses == 0
+
+
+def test_get__expired():
+    cache = TTLCache(10, 0.1)
+    cache.put("key", "value")
+
+    time.sleep(0.2)
+
+    assert "key" not in cache
+    assert cache.get("key") is None
+    assert cache.misses == 1
+    assert len(cache) == 0
+
+
+def test_put__custom_ttl():
+    cache = TTLCache(10, 0.1)
+    cache.put("short", "value")
+    cache.put("long", "value", ttl=60)
+
+    time.sleep(0.2)
+
+    assert cache.get("short") is None
+    assert cache.get("long") == "value"
+
+
+def test_put__evicts_least_recently_used():
+    cache = TTLCache(2, 60)
+    cache.put("first", 1)
+    cache.put("second", 2)
+    cache.get("first")
+
+    cache.put("third", 3)
+
+    assert len(cache) == 2
+    assert cache.get("first") == 1
+    assert cache.get("second") is None
+    assert cache.get("third") == 3
+
+
+def test_invalidate():
+    cache = TTLCache(10, 60)
+    cache.put("key", "value")
+    cache.put("other", "value")
+
+    cache.invalidate("key")
+    cache.invalidate("never_added")
+
+    assert cache.get("key") is None
+    assert cache.get("other") == "value"
+
+
+def test_clear():
+    cache = TTLCache(10, 60)
+    cache.put("key", "value")
+
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.get("key") is None
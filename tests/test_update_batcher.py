@@ -0,0 +1,176 @@
+import datetime
+from typing import List
+from unittest.mock import MagicMock
+
+import pytest
+from telegram.error import BadRequest
+
+from fa_submission import FASubmission
+from file_id_cache import FileIdCache
+from subscription_watcher import Subscription
+from tests.util.submission_builder import SubmissionBuilder
+from update_batcher import UpdateBatcher, PendingUpdate, update_prefix
+
+
+def _photo_update(query: str = "test", destination: int = 12345) -> PendingUpdate:
+    submission = SubmissionBuilder(file_ext="jpg", file_size=FASubmission.SIZE_LIMIT_IMAGE - 1)\
+        .build_full_submission()
+    return PendingUpdate([Subscription(query, destination)], submission)
+
+
+def _send(batcher: UpdateBatcher, bot, updates: List[PendingUpdate]) -> None:
+    for num, part in enumerate(batcher.split(updates)):
+        batcher.send_part(bot, 12345, part, continued=num > 0)
+
+
+def test_update_prefix():
+    assert update_prefix([Subscription("deer", 12345)]) == "Update on \"deer\" subscription:"
+    assert update_prefix([Subscription("deer", 12345), Subscription("fox", 12345)]) \
+        == "Update on \"deer\", \"fox\" subscriptions:"
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        UpdateBatcher("carrier pigeon", 60)
+
+
+def test_due__waits_for_flush_window():
+    batcher = UpdateBatcher(UpdateBatcher.ALBUM, 60)
+    start = datetime.datetime(2019, 5, 1, 12, 0)
+    update1 = _photo_update()
+    update2 = _photo_update()
+    batcher.add(12345, update1, now=start)
+    batcher.add(12345, update2, now=start + datetime.timedelta(seconds=30))
+    batcher.add(5678, _photo_update(destination=5678), now=start + datetime.timedelta(seconds=30))
+
+    assert batcher.due(now=start + datetime.timedelta(seconds=59)) == []
+    assert batcher.due(now=start + datetime.timedelta(seconds=60)) == [(12345, [update1, update2])]
+    assert batcher.due(now=start + datetime.timedelta(seconds=61)) == []
+    assert [destination for destination, _ in batcher.flush_all()] == [5678]
+    assert batcher.flush_all() == []
+
+
+def test_send__album_mode_sends_media_groups():
+    bot = MagicMock()
+    batcher = UpdateBatcher(UpdateBatcher.ALBUM, 60)
+    updates = [_photo_update() for _ in range(12)]
+
+    _send(batcher, bot, updates)
+
+    assert bot.send_media_group.call_count == 2
+    first_album = bot.send_media_group.call_args_list[0][1]['media']
+    assert len(first_album) == 10
+    assert first_album[0].media == updates[0].result.download_url
+    assert updates[0].result.link in first_album[0].caption
+    assert "\"test\"" in first_album[0].caption
+    assert len(bot.send_media_group.call_args_list[1][1]['media']) == 2
+    bot.send_photo.assert_not_called()
+
+
+def test_send__album_mode_sends_single_photo_alone():
+    bot = MagicMock()
+    batcher = UpdateBatcher(UpdateBatcher.ALBUM, 60)
+    updates = [_photo_update() for _ in range(11)]
+
+    _send(batcher, bot, updates)
+
+    assert bot.send_media_group.call_count == 1
+    bot.send_photo.assert_called_once()
+    assert bot.send_photo.call_args[1]['photo'] == updates[10].result.download_url
+
+
+def test_send__album_mode_sends_other_files_alone():
+    bot = MagicMock()
+    batcher = UpdateBatcher(UpdateBatcher.ALBUM, 60)
+    audio = SubmissionBuilder(file_ext="mp3", file_size=1000).build_full_submission()
+    updates = [_photo_update(), PendingUpdate([Subscription("test", 12345)], audio), _photo_update()]
+
+    _send(batcher, bot, updates)
+
+    bot.send_audio.assert_called_once()
+    bot.send_media_group.assert_called_once()
+    assert len(bot.send_media_group.call_args[1]['media']) == 2
+
+
+def test_send__digest_mode_sends_one_message():
+    bot = MagicMock()
+    batcher = UpdateBatcher(UpdateBatcher.DIGEST, 60)
+    updates = [_photo_update("deer"), _photo_update("fox")]
+
+    _send(batcher, bot, updates)
+
+    bot.send_message.assert_called_once()
+    text = bot.send_message.call_args[1]['text']
+    assert bot.send_message.call_args[1]['chat_id'] == 12345
+    assert f"\"deer\": {updates[0].result.link}" in text
+    assert f"\"fox\": {updates[1].result.link}" in text
+    bot.send_photo.assert_not_called()
+
+
+def test_send__digest_mode_splits_long_messages():
+    bot = MagicMock()
+    batcher = UpdateBatcher(UpdateBatcher.DIGEST, 60)
+    updates = [_photo_update("a" * 100) for _ in range(100)]
+
+    _send(batcher, bot, updates)
+
+    assert bot.send_message.call_count > 1
+    for call in bot.send_message.call_args_list:
+        assert len(call[1]['text']) <= UpdateBatcher.MAX_MESSAGE_LENGTH
+    assert sum(call[1]['text'].count("\n- ") for call in bot.send_message.call_args_list) == 100
+
+
+def test_split__album_mode_one_part_per_message():
+    batcher = UpdateBatcher(UpdateBatcher.ALBUM, 60)
+    audio = PendingUpdate(
+        [Subscription("test", 12345)], SubmissionBuilder(file_ext="mp3", file_size=1000).build_full_submission()
+    )
+    photos = [_photo_update() for _ in range(11)]
+
+    parts = batcher.split(photos[:5] + [audio] + photos[5:])
+
+    assert parts == [[audio], photos[:10], photos[10:]]
+
+
+def test_send_part__digest_mode_continued_message():
+    bot = MagicMock()
+    batcher = UpdateBatcher(UpdateBatcher.DIGEST, 60)
+
+    batcher.send_part(bot, 12345, [_photo_update("deer")], continued=True)
+
+    assert bot.send_message.call_args[1]['text'].startswith(UpdateBatcher.DIGEST_CONTINUED)
+
+
+def test_send_part__resends_album_from_urls_when_cached_file_id_rejected():
+    bot = MagicMock()
+    bot.send_media_group.side_effect = [BadRequest("Wrong file identifier/http url specified"), None]
+    batcher = UpdateBatcher(UpdateBatcher.ALBUM, 60)
+    updates = [_photo_update(), _photo_update()]
+    file_id_cache = FileIdCache(10)
+    file_id_cache._put((updates[0].result.submission_id, FileIdCache.PHOTO), "expired_file_id")
+
+    batcher.send_part(bot, 12345, updates, file_id_cache)
+
+    assert bot.send_media_group.call_count == 2
+    assert bot.send_media_group.call_args_list[0][1]['media'][0].media == "expired_file_id"
+    assert bot.send_media_group.call_args_list[1][1]['media'][0].media == updates[0].result.download_url
+    assert file_id_cache.get(updates[0].result.submission_id, FileIdCache.PHOTO) is None
+
+
+def test_send_part__records_album_file_ids():
+    bot = MagicMock()
+    big_submission = SubmissionBuilder(file_ext="jpg", file_size=FASubmission.SIZE_LIMIT_IMAGE + 1)\
+        .build_full_submission()
+    updates = [_photo_update(), PendingUpdate([Subscription("test", 12345)], big_submission)]
+    messages = [MagicMock(), MagicMock()]
+    messages[0].photo = [MagicMock(file_id="small_photo"), MagicMock(file_id="photo_file_id")]
+    messages[1].photo = [MagicMock(file_id="thumbnail_file_id")]
+    bot.send_media_group.return_value = messages
+    batcher = UpdateBatcher(UpdateBatcher.ALBUM, 60)
+    file_id_cache = FileIdCache(10)
+
+    batcher.send_part(bot, 12345, updates, file_id_cache)
+
+    assert file_id_cache.get(updates[0].result.submission_id, FileIdCache.PHOTO) == "photo_file_id"
+    assert file_id_cache.get(big_submission.submission_id, FileIdCache.THUMBNAIL) == "thumbnail_file_id"
+    assert file_id_cache.get(big_submission.submission_id, FileIdCache.PHOTO) is None
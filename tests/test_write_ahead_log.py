@@ -0,0 +1,53 @@
+import os
+
+from write_ahead_log import WriteAheadLog
+
+TEST_LOG_FILE = "./test_write_ahead_log.log.jsonl"
+
+
+def setup_function():
+    if os.path.exists(TEST_LOG_FILE):
+        os.remove(TEST_LOG_FILE)
+
+
+def teardown_function():
+    if os.path.exists(TEST_LOG_FILE):
+        os.remove(TEST_LOG_FILE)
+
+
+def test_read__no_file():
+    log = WriteAheadLog(TEST_LOG_FILE)
+
+    assert list(log.read()) == []
+
+
+def test_append_and_read():
+    log = WriteAheadLog(TEST_LOG_FILE)
+
+    log.append({"type": "latest_id", "id": "1234"})
+    log.append({"type": "latest_id", "id": "1235"})
+
+    assert log.entries == 2
+    assert list(log.read()) == [{"type": "latest_id", "id": "1234"}, {"type": "latest_id", "id": "1235"}]
+
+
+def test_read__ignores_partial_last_line():
+    log = WriteAheadLog(TEST_LOG_FILE)
+    log.append({"type": "latest_id", "id": "1234"})
+    with open(TEST_LOG_FILE, "a") as f:
+        f.write("{\"type\": \"lat")
+
+    assert list(log.read()) == [{"type": "latest_id", "id": "1234"}]
+
+
+def test_compact():
+    log = WriteAheadLog(TEST_LOG_FILE)
+    log.append({"type": "latest_id", "id": "1234"})
+    snapshots = []
+
+    log.compact(lambda: snapshots.append(list(log.read())))
+
+    assert snapshots == [[{"type": "latest_id", "id": "1234"}]]
+    assert log.entries == 0
+    assert list(log.read()) == []
+    assert not os.path.exists(TEST_LOG_FILE)
@@ -4,6 +4,8 @@ from typing import Union, List
 
 from fa_export_api import FAExportAPI, PageNotFound
 from fa_submission import FASubmission, FASubmissionFull, FAUser, Rating
+from rate_limiter import Priority
+from submission_page import SubmissionPage
 
 
 def _random_image_id(submission_id: int) -> int:
@@ -81,6 +83,22 @@ class MockSubmission(FASubmissionFull):
         self._download_file_size = file_size
 
 
+class MockSubmissionPage(SubmissionPage):
+    """
+    A page of results made of submissions which have already been built.
+    """
+
+    def __init__(self, submissions: List[FASubmission]):
+        super().__init__([{"id": submission.submission_id} for submission in submissions])
+        self._submissions = list(submissions)
+
+
+def _page(submissions: Union[SubmissionPage, List[FASubmission]]) -> SubmissionPage:
+    if isinstance(submissions, SubmissionPage):
+        return submissions
+    return MockSubmissionPage(submissions)
+
+
 class MockExportAPI(FAExportAPI):
 
     def __init__(self):
@@ -133,34 +151,42 @@ class MockExportAPI(FAExportAPI):
         self.with_submissions(list_submissions)
         return self
 
-    def get_full_submission(self, submission_id: str) -> FASubmission:
+    def get_full_submission(
+            self, submission_id: str, priority: Priority = Priority.INTERACTIVE
+    ) -> FASubmission:
         if submission_id not in self.submissions:
             raise PageNotFound(f"Submission not found with ID: {submission_id}")
         return self.submissions[submission_id]
 
-    def get_user_folder(self, user: str, folder: str, page: int = 1) -> List[FASubmission]:
+    def get_user_folder(
+            self, user: str, folder: str, page: int = 1, priority: Priority = Priority.INTERACTIVE
+    ) -> SubmissionPage:
         if user not in self.user_folders:
-            return []
+            return MockSubmissionPage([])
         if f"{folder}:{page}" not in self.user_folders[user]:
-            return []
-        return self.user_folders[user][f"{folder}:{page}"]
+            return MockSubmissionPage([])
+        return _page(self.user_folders[user][f"{folder}:{page}"])
 
-    def get_user_favs(self, user: str, next_id: int = 1) -> List[FASubmission]:
+    def get_user_favs(
+            self, user: str, next_id: int = 1, priority: Priority = Priority.INTERACTIVE
+    ) -> SubmissionPage:
         if user not in self.user_folders:
-            return []
+            return MockSubmissionPage([])
         if f"favs:{next_id}" not in self.user_folders[user]:
-            return []
-        return self.user_folders[user][f"favs:{next_id}"]
+            return MockSubmissionPage([])
+        return _page(self.user_folders[user][f"favs:{next_id}"])
 
-    def get_search_results(self, query: str, page: int = 1) -> List[FASubmission]:
+    def get_search_results(
+            self, query: str, page: int = 1, priority: Priority = Priority.INTERACTIVE
+    ) -> SubmissionPage:
         if f"{query.lower()}:{page}" not in self.search_results:
-            return []
-        return self.search_results[f"{query.lower()}:{page}"]
+            return MockSubmissionPage([])
+        return _page(self.search_results[f"{query.lower()}:{page}"])
 
-    def get_browse_page(self, page: int = 1) -> List[FASubmission]:
+    def get_browse_page(self, page: int = 1, priority: Priority = Priority.INTERACTIVE) -> SubmissionPage:
         self.browse_count += 1
         if self.browse_count >= self.call_after_x_browse[1]:
             self.call_after_x_browse[0]()
         if page not in self.browse_results:
-            return []
-        return self.browse_results[page]
+            return MockSubmissionPage([])
+        return _page(self.browse_results[page])
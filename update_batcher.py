@@ -0,0 +1,176 @@
+import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import telegram
+from telegram.error import BadRequest
+
+from delivery_queue import wait_until_sent
+from fa_submission import FASubmissionFull
+from file_id_cache import FileIdCache
+
+
+class PendingUpdate(NamedTuple):
+    subscriptions: List['Subscription']
+    result: FASubmissionFull
+
+
+def _quoted_queries(subscriptions: List['Subscription']) -> str:
+    return ", ".join(f"\"{subscription.query}\"" for subscription in subscriptions)
+
+
+def update_prefix(subscriptions: List['Subscription']) -> str:
+    queries = _quoted_queries(subscriptions)
+    if len(subscriptions) == 1:
+        return f"Update on {queries} subscription:"
+    return f"Update on {queries} subscriptions:"
+
+
+class UpdateBatcher:
+    """
+    Collects subscription updates for each destination, and sends them together once the flush window has passed.
+    In album mode, photos are sent in albums of up to ten, and in digest mode, all the updates are sent as one message
+    of links.
+    """
+    ALBUM = "album"
+    DIGEST = "digest"
+    MODES = [ALBUM, DIGEST]
+    MAX_ALBUM_SIZE = 10  # Telegram allows 2 to 10 items in a media group
+    MAX_MESSAGE_LENGTH = 4096
+    DEFAULT_FLUSH_WINDOW = 300
+    DIGEST_HEADER = "Updates on your subscriptions:"
+    DIGEST_CONTINUED = "More updates on your subscriptions:"
+
+    def __init__(self, mode: str, flush_window: float):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown subscription delivery mode: {mode}")
+        self.mode = mode
+        self.flush_window = flush_window
+        self._pending = dict()  # type: Dict[int, List[PendingUpdate]]
+        self._first_added = dict()  # type: Dict[int, datetime.datetime]
+
+    def add(self, destination: int, update: PendingUpdate, now: Optional[datetime.datetime] = None) -> None:
+        if now is None:
+            now = datetime.datetime.now()
+        if destination not in self._pending:
+            self._pending[destination] = []
+            self._first_added[destination] = now
+        self._pending[destination].append(update)
+
+    def due(self, now: Optional[datetime.datetime] = None) -> List[Tuple[int, List[PendingUpdate]]]:
+        """
+        Removes and returns the batches for destinations whose flush window has passed.
+        """
+        if now is None:
+            now = datetime.datetime.now()
+        window = datetime.timedelta(seconds=self.flush_window)
+        due_destinations = [
+            destination for destination, first_added in self._first_added.items() if now - first_added >= window
+        ]
+        return [(destination, self._take(destination)) for destination in due_destinations]
+
+    def flush_all(self) -> List[Tuple[int, List[PendingUpdate]]]:
+        return [(destination, self._take(destination)) for destination in list(self._pending.keys())]
+
+    def _take(self, destination: int) -> List[PendingUpdate]:
+        del self._first_added[destination]
+        return self._pending.pop(destination)
+
+    def split(self, updates: List[PendingUpdate]) -> List[List[PendingUpdate]]:
+        """
+        Splits a batch into the parts which are each sent as one message, so that each part can be sent, and retried,
+        on its own, without sending the rest of the batch again.
+        In album mode, photos are grouped into albums, and other files are sent on their own, and in digest mode, the
+        updates are split across as many messages as needed to fit.
+        """
+        if self.mode == self.ALBUM:
+            return self._split_albums(updates)
+        return self._split_digest(updates)
+
+    def _split_albums(self, updates: List[PendingUpdate]) -> List[List[PendingUpdate]]:
+        parts = []  # type: List[List[PendingUpdate]]
+        photos = []  # type: List[PendingUpdate]
+        for update in updates:
+            if update.result.is_photo():
+                photos.append(update)
+            else:
+                # Files which can't go in an album are sent on their own
+                parts.append([update])
+        for start in range(0, len(photos), self.MAX_ALBUM_SIZE):
+            parts.append(photos[start:start + self.MAX_ALBUM_SIZE])
+        return parts
+
+    def _split_digest(self, updates: List[PendingUpdate]) -> List[List[PendingUpdate]]:
+        parts = [[]]  # type: List[List[PendingUpdate]]
+        length = len(self.DIGEST_CONTINUED)
+        for update in updates:
+            line_length = len(self._digest_line(update))
+            if parts[-1] and length + line_length > self.MAX_MESSAGE_LENGTH:
+                parts.append([])
+                length = len(self.DIGEST_CONTINUED)
+            parts[-1].append(update)
+            length += line_length
+        return parts
+
+    def send_part(
+            self,
+            bot,
+            destination: int,
+            part: List[PendingUpdate],
+            file_id_cache: Optional[FileIdCache] = None,
+            continued: bool = False
+    ) -> None:
+        """
+        Sends one part of a batch, as split by split(), waiting until it has been sent.
+        """
+        if self.mode == self.DIGEST:
+            header = self.DIGEST_CONTINUED if continued else self.DIGEST_HEADER
+            text = header + "".join(self._digest_line(update) for update in part)
+            wait_until_sent(bot.send_message(chat_id=destination, text=text))
+            return
+        if len(part) == 1:
+            update = part[0]
+            wait_until_sent(update.result.send_message(
+                bot, destination, prefix=self._prefix(update), file_id_cache=file_id_cache
+            ))
+            return
+        media = [update.result.to_input_media_photo(self._caption(update), file_id_cache) for update in part]
+        uncached_media = [update.result.to_input_media_photo(self._caption(update)) for update in part]
+        if [item.media for item in media] == [item.media for item in uncached_media]:
+            messages = wait_until_sent(bot.send_media_group(chat_id=destination, media=media))
+            self._record_file_ids(part, uncached_media, messages, file_id_cache)
+            return
+        try:
+            messages = wait_until_sent(bot.send_media_group(chat_id=destination, media=media))
+        except BadRequest as e:
+            # Telegram may no longer accept cached file_ids, so forget them, and send the album again from the URLs
+            print(f"Telegram rejected cached files in an album for {destination} because {e}")
+            for update in part:
+                file_id_cache.invalidate(update.result.submission_id, FileIdCache.PHOTO)
+                file_id_cache.invalidate(update.result.submission_id, FileIdCache.THUMBNAIL)
+            messages = wait_until_sent(bot.send_media_group(chat_id=destination, media=uncached_media))
+        self._record_file_ids(part, uncached_media, messages, file_id_cache)
+
+    @staticmethod
+    def _record_file_ids(
+            part: List[PendingUpdate],
+            uncached_media: List[telegram.InputMediaPhoto],
+            messages: Optional[List[telegram.Message]],
+            file_id_cache: Optional[FileIdCache]
+    ) -> None:
+        if file_id_cache is None or not messages:
+            return
+        # Album messages come back in the order they were sent
+        for update, item, message in zip(part, uncached_media, messages):
+            send_type = FileIdCache.THUMBNAIL if item.media == update.result.thumbnail_url else FileIdCache.PHOTO
+            file_id_cache.record(update.result.submission_id, send_type, message)
+
+    @staticmethod
+    def _digest_line(update: PendingUpdate) -> str:
+        return f"\n- {_quoted_queries(update.subscriptions)}: {update.result.link}"
+
+    @staticmethod
+    def _prefix(update: PendingUpdate) -> str:
+        return update_prefix(update.subscriptions)
+
+    def _caption(self, update: PendingUpdate) -> str:
+        return f"{self._prefix(update)}\n{update.result.link}"
@@ -0,0 +1,45 @@
+import json
+import os
+import threading
+from typing import Dict, Any, Iterator, Callable
+
+
+class WriteAheadLog:
+    """
+    Append only log of changes, one JSON object per line.
+    A partially written last line, from the process dying mid-write, is ignored when reading.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.entries = 0
+        self._lock = threading.Lock()
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            with open(self.filename, "a") as f:
+                f.write(line)
+            self.entries += 1
+
+    def read(self) -> Iterator[Dict[str, Any]]:
+        try:
+            with open(self.filename, "r") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        return
+        except FileNotFoundError:
+            return
+
+    def compact(self, write_snapshot: Callable[[], None]) -> None:
+        """
+        Writes a snapshot which includes every change logged so far, and then empties the log.
+        Changes cannot be logged while the snapshot is being written, so none are lost.
+        """
+        with self._lock:
+            write_snapshot()
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
+            self.entries = 0